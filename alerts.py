@@ -0,0 +1,157 @@
+"""
+Concurrent WhatsApp alert fan-out
+Sends one alert to many recipients from a bounded sender pool, respecting per-account
+and per-recipient rate limits and splitting long messages into ordered parts
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+
+MESSAGE_LIMIT = 1500
+
+
+def split_message(message, limit=MESSAGE_LIMIT):
+    """Split a message into ordered parts of at most `limit` characters, preferring line breaks"""
+    if len(message) <= limit:
+        return [message]
+
+    # Leave room for the " (n/m)" part marker
+    budget = limit - 10
+    parts = []
+    current = ''
+    for line in message.splitlines(keepends=True):
+        while len(line) > budget:
+            if current:
+                parts.append(current)
+                current = ''
+            parts.append(line[:budget])
+            line = line[budget:]
+        if current and len(current) + len(line) > budget:
+            parts.append(current)
+            current = ''
+        current += line
+    if current:
+        parts.append(current)
+
+    total = len(parts)
+    return [f"{part.rstrip()} ({i}/{total})" for i, part in enumerate(parts, 1)]
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AlertSender:
+    """Fans an alert out to recipients and recipient groups through a bounded thread pool"""
+
+    def __init__(self, client, from_, config):
+        self.client = client
+        self.from_ = from_
+        self.executor = ThreadPoolExecutor(max_workers=config.get('alert_workers', 8))
+        self.recipient_buckets = {}
+        self.lock = threading.Lock()
+        self.configure(config)
+
+    def configure(self, config):
+        """Apply recipient groups, retries and rate limits (also on config reload)"""
+        self.groups = config.get('recipient_groups', {})
+        self.retries = config.get('alert_retries', 3)
+        with self.lock:
+            self.account_bucket = TokenBucket(
+                config.get('alert_rate_per_second', 10),
+                config.get('alert_burst', 10)
+            )
+            self.recipient_rate = config.get('alert_rate_per_recipient', 1)
+            self.recipient_buckets = {}
+
+    def resolve(self, recipients):
+        """Expand a recipient, a comma-separated string or list of them, and '@group' names into unique numbers"""
+        if isinstance(recipients, str):
+            recipients = [r.strip() for r in recipients.split(',') if r.strip()]
+        resolved = []
+        for recipient in recipients or []:
+            if recipient.startswith('@'):
+                members = self.groups.get(recipient[1:])
+                if members is None:
+                    print(f"⚠ Unknown recipient group {recipient}, check recipient_groups")
+                    continue
+            else:
+                members = [recipient]
+            for member in members:
+                if member not in resolved:
+                    resolved.append(member)
+        return resolved
+
+    def recipient_bucket(self, to):
+        with self.lock:
+            if to not in self.recipient_buckets:
+                self.recipient_buckets[to] = TokenBucket(self.recipient_rate)
+            return self.recipient_buckets[to]
+
+    def send_parts(self, to, parts):
+        """Send every part to one recipient in order; returns the message SIDs"""
+        sids = []
+        for part in parts:
+            for attempt in range(self.retries + 1):
+                # Wait for the recipient first so a throttled number does not hold account tokens
+                self.recipient_bucket(to).acquire()
+                self.account_bucket.acquire()
+                try:
+                    msg = self.client.messages.create(body=part, from_=self.from_, to=to)
+                    sids.append(msg.sid)
+                    break
+                except Exception as e:
+                    # Back off and retry when the provider rate-limits us
+                    if getattr(e, 'status', None) != 429 or attempt == self.retries:
+                        raise
+                    time.sleep(2 ** attempt)
+        return sids
+
+    def submit(self, message, recipients):
+        """Start sending a message to all recipients; returns {recipient: future} for wait()"""
+        parts = split_message(message)
+        return {to: self.executor.submit(self.send_parts, to, parts) for to in self.resolve(recipients)}
+
+    def send(self, message, recipients):
+        """Send a message to all recipients concurrently; returns True if every send succeeded"""
+        return self.wait(self.submit(message, recipients))
+
+    def wait(self, futures):
+        """Wait for the sends started by submit(); returns True if every send succeeded
+
+        An alert that resolved to no recipients counts as not sent.
+        """
+        if not futures:
+            print("✗ WhatsApp alert not sent: no recipients resolved")
+            return False
+        ok = True
+        for to, future in futures.items():
+            try:
+                sids = future.result()
+                label = f" in {len(sids)} parts" if len(sids) > 1 else ''
+                print(f"✓ WhatsApp alert sent to {to}{label} (SID: {', '.join(sids)})")
+            except Exception as e:
+                print(f"✗ Failed to send WhatsApp alert to {to}: {e}")
+                ok = False
+        return ok
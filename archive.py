@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Content-addressed page archive
+Stores every fetched page under its SHA-256 with zstd (or gzip) compression and
+deduplication, and reruns the current extractors over archived pages offline
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import argparse
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import time
+
+try:
+    import zstandard
+except ImportError:  # gzip is used when zstandard is not installed
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Only one process may write the archive on platforms without fcntl
+    fcntl = None
+
+from product_record import json_default
+
+
+EXTRACTORS = {
+    'browser': 'monitor:SheinMonitor.extract_counts',
+    'simple': 'monitor_simple:SheinMonitor.extract_counts',
+    'api': 'monitor_api:SheinMonitor.extract_counts',
+    'products': 'monitor_products:SheinProductMonitor.extract_products',
+    'targeted': 'targeted_parse:extract_products',
+    'state': 'initial_state:extract_state_counts',
+}
+
+
+def load_extractor(path):
+    """Resolve 'module:attr.attr' (or a name from EXTRACTORS) to a callable"""
+    module_name, attr_path = EXTRACTORS.get(path, path).split(':')
+    target = importlib.import_module(module_name)
+    for attr in attr_path.split('.'):
+        target = getattr(target, attr)
+    return target
+
+
+class PageArchive:
+    """Pages stored once per content hash, with a time-ordered index of fetches"""
+
+    def __init__(self, root='archive', retention_days=30, max_bytes=None):
+        self.root = root
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self.codec = 'zst' if zstandard else 'gz'
+        self.stores = 0
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+    @contextmanager
+    def locked(self):
+        """Exclusive lock on the blobs and index, shared by every thread and process using the archive"""
+        with open(os.path.join(self.root, 'archive.lock'), 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def blob_path(self, digest, codec):
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest[2:]}.{codec}")
+
+    def compress(self, data):
+        if self.codec == 'zst':
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def decompress(data, codec):
+        if codec == 'zst':
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read .zst archive entries")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def store(self, url, html, status=None):
+        """Archive a fetched page; identical pages share one compressed blob"""
+        data = html.encode('utf-8') if isinstance(html, str) else html
+        digest = hashlib.sha256(data).hexdigest()
+        codec = self.codec
+        compressed = None
+        if not any(os.path.exists(self.blob_path(digest, c)) for c in ('zst', 'gz')):
+            compressed = self.compress(data)
+
+        # Blob and index entry are written together so a concurrent prune never sees one without the other
+        with self.locked():
+            existing = [c for c in ('zst', 'gz') if os.path.exists(self.blob_path(digest, c))]
+            if existing:
+                codec = existing[0]
+            else:
+                path = self.blob_path(digest, codec)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed if compressed is not None else self.compress(data))
+                os.replace(tmp_path, path)
+
+            entry = {
+                'ts': time.time(),
+                'url': url,
+                'hash': digest,
+                'codec': codec,
+                'size': len(data),
+            }
+            if status is not None:
+                entry['status'] = status
+            with open(self.index_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+            self.stores += 1
+            if self.stores % 100 == 1:
+                self.prune_locked()
+        return digest
+
+    def entries(self, start=None, end=None, url=None):
+        """Index entries in time order, optionally filtered by time range and URL"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if start is not None and entry['ts'] < start:
+                    continue
+                if end is not None and entry['ts'] > end:
+                    continue
+                if url is not None and entry['url'] != url:
+                    continue
+                yield entry
+
+    def read(self, entry):
+        """Return the archived page for an index entry"""
+        with open(self.blob_path(entry['hash'], entry['codec']), 'rb') as f:
+            return self.decompress(f.read(), entry['codec']).decode('utf-8', errors='replace')
+
+    def prune(self):
+        """Apply retention: drop old index entries, then unreferenced and over-budget blobs"""
+        with self.locked():
+            self.prune_locked()
+
+    def prune_locked(self):
+        """prune() for callers that already hold the archive lock"""
+        cutoff = time.time() - self.retention_days * 86400 if self.retention_days else None
+        kept = list(self.entries(start=cutoff))
+
+        # Enforce the size budget by dropping the oldest fetches first
+        blob_sizes = {}
+        references = Counter()
+        for entry in kept:
+            path = self.blob_path(entry['hash'], entry['codec'])
+            references[path] += 1
+            if path not in blob_sizes and os.path.exists(path):
+                blob_sizes[path] = os.path.getsize(path)
+        if self.max_bytes:
+            total = sum(blob_sizes.values())
+            dropped = 0
+            while dropped < len(kept) and total > self.max_bytes:
+                oldest = kept[dropped]
+                dropped += 1
+                path = self.blob_path(oldest['hash'], oldest['codec'])
+                references[path] -= 1
+                if not references[path]:
+                    total -= blob_sizes.pop(path, 0)
+            kept = kept[dropped:]
+
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            for entry in kept:
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.index_path)
+
+        objects = os.path.join(self.root, 'objects')
+        for prefix in os.listdir(objects):
+            for name in os.listdir(os.path.join(objects, prefix)):
+                path = os.path.join(objects, prefix, name)
+                # .tmp files are blobs still being written
+                if path not in blob_sizes and not name.endswith('.tmp'):
+                    os.remove(path)
+
+
+def _reparse_one(root, entry, extractor_path):
+    html = PageArchive(root, retention_days=None).read(entry)
+    return load_extractor(extractor_path)(html)
+
+
+def parse_time(value):
+    """Accept epoch seconds or an ISO 8601 timestamp (UTC if no offset is given)"""
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+
+
+def reparse(root, extractor_path, start=None, end=None, url=None, workers=None):
+    """Rerun an extractor over archived pages in parallel, without network access"""
+    archive = PageArchive(root, retention_days=None)
+    entries = list(archive.entries(start, end, url))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_reparse_one, root, entry, extractor_path) for entry in entries]
+        for entry, future in zip(entries, futures):
+            try:
+                result = future.result()
+                error = None
+            except Exception as e:
+                result, error = None, str(e)
+            yield entry, result, error
+
+
+def main():
+    """Command line entry point: archive.py reparse [options]"""
+    parser = argparse.ArgumentParser(description="Shein page archive")
+    commands = parser.add_subparsers(dest='command', required=True)
+    rp = commands.add_parser('reparse', help="rerun extractors over archived pages")
+    rp.add_argument('--archive', default='archive')
+    rp.add_argument('--extractor', default='simple', help=f"one of {', '.join(EXTRACTORS)} or module:attr")
+    rp.add_argument('--from', dest='start', type=parse_time)
+    rp.add_argument('--to', dest='end', type=parse_time)
+    rp.add_argument('--url')
+    rp.add_argument('--workers', type=int)
+    pr = commands.add_parser('prune', help="apply retention limits")
+    pr.add_argument('--archive', default='archive')
+    pr.add_argument('--retention-days', type=float, default=30)
+    pr.add_argument('--max-bytes', type=int)
+    args = parser.parse_args()
+
+    if args.command == 'prune':
+        PageArchive(args.archive, args.retention_days, args.max_bytes).prune()
+        print("✓ Archive pruned")
+        return
+
+    for entry, result, error in reparse(args.archive, args.extractor, args.start, args.end, args.url, args.workers):
+        record = {
+            'ts': datetime.fromtimestamp(entry['ts'], timezone.utc).isoformat(),
+            'url': entry['url'],
+            'hash': entry['hash'],
+        }
+        if error:
+            record['error'] = error
+        else:
+            record['result'] = result
+        print(json.dumps(record, default=json_default))
+
+
+if __name__ == '__main__':
+    main()
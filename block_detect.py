@@ -0,0 +1,83 @@
+"""
+Bot-challenge and block-page detection
+Classifies a fetch from its status code, headers and the first few KB of the body,
+so challenge and block pages are rejected before any parsing
+"""
+
+from collections import deque
+import re
+
+
+HEAD_BYTES = 8192
+
+CHALLENGE_RE = re.compile(
+    r'cf-chl|just a moment\.\.\.|checking your browser|verify you are human'
+    r'|px-captcha|_pxcaptcha|captcha-delivery',
+    re.IGNORECASE
+)
+BLOCK_RE = re.compile(
+    r'access denied|attention required! \| cloudflare|you have been blocked|request blocked'
+    r'|error 1020|_incapsula_resource|are you a robot|unusual traffic|reference #\d',
+    re.IGNORECASE
+)
+
+
+class PageBlocked(Exception):
+    """Raised by fetch_page when the response is a challenge or block page"""
+
+    def __init__(self, kind, status=None):
+        super().__init__(f"{kind} page" + (f" (HTTP {status})" if status else ''))
+        self.kind = kind
+        self.status = status
+
+
+def classify_response(status_code, headers, head):
+    """Return 'challenge', 'blocked', 'rate_limited' or None for a normal page"""
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    head = (head or '')[:HEAD_BYTES]
+
+    if headers.get('cf-mitigated', '').lower() == 'challenge' or CHALLENGE_RE.search(head):
+        return 'challenge'
+    if status_code == 429:
+        return 'rate_limited'
+    if status_code in (401, 403, 503) or BLOCK_RE.search(head):
+        return 'blocked'
+    return None
+
+
+def check_response(response):
+    """Raise PageBlocked if a requests-style response is a challenge or block page"""
+    kind = classify_response(response.status_code, response.headers, response.text[:HEAD_BYTES])
+    if kind:
+        raise PageBlocked(kind, response.status_code)
+
+
+def check_html(html):
+    """Raise PageBlocked if a browser-rendered page is a challenge or block page"""
+    kind = classify_response(None, {}, html[:HEAD_BYTES] if html else '')
+    if kind:
+        raise PageBlocked(kind)
+
+
+def check_driver(driver):
+    """Raise PageBlocked if the page loaded in a WebDriver is a challenge or block page"""
+    check_html(driver.execute_script(f"return document.documentElement.outerHTML.slice(0, {HEAD_BYTES})"))
+
+
+class BlockStats:
+    """Block rate over the last `window` fetches, plus totals per kind"""
+
+    def __init__(self, window=100):
+        self.recent = deque(maxlen=window)
+        self.totals = {}
+
+    def record(self, kind):
+        kind = kind or 'ok'
+        self.recent.append(kind != 'ok')
+        self.totals[kind] = self.totals.get(kind, 0) + 1
+
+    def rate(self):
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def summary(self):
+        return f"{self.rate():.0%} of last {len(self.recent)} fetches blocked"
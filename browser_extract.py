@@ -0,0 +1,147 @@
+"""
+In-browser extraction
+Runs compact JavaScript extractors inside the loaded page through execute_script so only
+the counts or product records cross the WebDriver protocol instead of the whole page_source
+"""
+
+from datetime import datetime
+
+
+COUNTS_SCRIPT = r'''
+const counts = {};
+const num = s => parseInt(s.replace(/,/g, ''), 10);
+const text = document.body ? document.body.innerText : '';
+
+// Strategy 1: total products count
+let m = text.match(/(\d{1,3}(?:,\d{3})*)\s*(?:products|items)/i);
+if (m) counts.total = num(m[1]);
+
+// Strategy 2: gender filters such as "Women (2,914)" or "Men (7)"
+m = text.match(/Women[^\d]*\((\d{1,3}(?:,\d{3})*)\)/i);
+if (m) counts.women = num(m[1]);
+m = text.match(/Men[^\d]*\((\d{1,3}(?:,\d{3})*)\)/i);
+if (m) counts.men = num(m[1]);
+
+// Strategy 3: JSON-LD numberOfItems
+for (const s of document.querySelectorAll('script[type="application/ld+json"]')) {
+  try {
+    const data = JSON.parse(s.textContent);
+    if (data && !Array.isArray(data) && 'numberOfItems' in data) counts.total = num(String(data.numberOfItems));
+  } catch (e) {}
+}
+
+// Strategy 4: filter labels holding a single text node
+for (const el of document.querySelectorAll('label, div, span')) {
+  if (el.childNodes.length !== 1 || el.firstChild.nodeType !== Node.TEXT_NODE) continue;
+  const t = el.textContent;
+  if (!/(Women|Men)\s*\(\d+\)/.test(t)) continue;
+  const c = t.match(/\((\d{1,3}(?:,\d{3})*)\)/);
+  if (!c) continue;
+  if (t.includes('Women')) counts.women = num(c[1]);
+  else if (t.includes('Men')) counts.men = num(c[1]);
+}
+
+// Facet rules: send back only the lines holding a count, each with the line before it
+// in case the label sits in its own block
+if (arguments[0]) {
+  const lines = text.split('\n');
+  const keep = new Set();
+  lines.forEach((line, i) => {
+    if (/\(\s*\d/.test(line)) {
+      if (i > 0) keep.add(i - 1);
+      keep.add(i);
+    }
+  });
+  counts.facet_text = [...keep].sort((a, b) => a - b).map(i => lines[i]).join('\n');
+}
+return counts;
+'''
+
+PRODUCTS_SCRIPT = r'''
+const cardRe = /product|goods-item|S-product/i;
+const menRe = /(^|[^a-z0-9])(men|man|mens|men's|male|boy|boys)(?![a-z0-9])/;
+const findByClass = (root, selector, re) => {
+  for (const el of root.querySelectorAll(selector)) {
+    if (re.test(el.getAttribute('class') || '')) return el;
+  }
+  return null;
+};
+const linkRe = /-p-(\d+)/;
+const productLink = el => {
+  for (const a of el.querySelectorAll('a[href*="-p-"]')) {
+    if (linkRe.test(a.getAttribute('href'))) return a;
+  }
+  return null;
+};
+
+// Same rule as the Python parsers: a card holds a product link, and containers such as
+// `product-list` that match the card classes too are skipped in favour of the innermost cards
+const cards = [];
+for (const el of document.querySelectorAll('article, div')) {
+  if (!cardRe.test(el.getAttribute('class') || '')) continue;
+  const link = productLink(el);
+  if (link) cards.push([el, link]);
+}
+const cardSet = new Set(cards.map(([el]) => el));
+const containers = new Set();
+for (const [el] of cards) {
+  for (let p = el.parentElement; p && !containers.has(p); p = p.parentElement) {
+    if (cardSet.has(p)) containers.add(p);
+  }
+}
+
+const records = [];
+for (const [card, link] of cards) {
+  if (containers.has(card)) continue;
+  const url = link.getAttribute('href');
+  const id = url.match(linkRe);
+  const title = findByClass(card, 'h2, h3, div', /title|name/i);
+  const price = findByClass(card, 'span, div', /price/i);
+  const cardText = card.textContent.toLowerCase();
+  records.push([
+    id[1],
+    title ? title.textContent.trim().slice(0, 100) : 'Unknown Product',
+    url,
+    price ? price.textContent.trim() : 'N/A',
+    menRe.test(cardText),
+  ]);
+}
+return records;
+'''
+
+
+def extract_counts_in_browser(driver, facets=None):
+    """Extract product counts inside the page and return them as a dict
+
+    facets is a FacetExtractor compiled without the built-in patterns; it is matched
+    against the count-bearing lines of the page text.
+    """
+    counts = driver.execute_script(COUNTS_SCRIPT, facets is not None) or {}
+    facet_text = counts.pop('facet_text', None)
+    if facet_text:
+        counts.update(facets.scan(facet_text))
+    return counts if counts else None
+
+
+def extract_products_in_browser(driver):
+    """Extract product records inside the page and return them in the extract_products layout"""
+    records = driver.execute_script(PRODUCTS_SCRIPT) or []
+    products = {'men': [], 'women': []}
+    detected_at = datetime.utcnow().isoformat() + 'Z'
+
+    print(f"Found {len(records)} product cards (in-browser)")
+    for product_id, name, url, price, is_men in records:
+        product_info = {
+            'id': product_id,
+            'name': name,
+            'url': url,
+            'price': price,
+            'detected_at': detected_at
+        }
+        if is_men:
+            products['men'].append(product_info)
+        else:
+            products['women'].append(product_info)
+
+    print(f"✓ Extracted {len(products['men'])} men's products, {len(products['women'])} women's products")
+    return products
@@ -0,0 +1,124 @@
+"""
+Persistent Chrome profile
+Keeps a managed user-data directory and HTTP disk cache between runs so JS bundles,
+CSS and bot-detection cookies survive restarts, with size limits and recovery from
+crashed or corrupted profiles
+"""
+
+import os
+import shutil
+import time
+
+try:
+    import fcntl
+except ImportError:  # Profile slots are not locked on platforms without fcntl
+    fcntl = None
+
+
+# Cache-like directories that can be dropped without losing cookies or local storage
+CACHE_DIRS = (
+    'DiskCache',
+    os.path.join('Default', 'Cache'),
+    os.path.join('Default', 'Code Cache'),
+    os.path.join('Default', 'Service Worker', 'CacheStorage'),
+    os.path.join('Default', 'GPUCache'),
+    'GrShaderCache',
+    'ShaderCache',
+)
+
+# Lock files a crashed Chrome leaves behind; they make the next launch refuse the profile
+STALE_LOCKS = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+
+def dir_size(path):
+    """Total size of the files under a directory, in bytes"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ChromeProfile:
+    """A reusable Chrome user-data directory; disabled when chrome_profile_dir is not set"""
+
+    def __init__(self, config):
+        self.root = config.get('chrome_profile_dir')
+        self.cache_mb = config.get('chrome_disk_cache_mb', 256)
+        self.max_mb = config.get('chrome_profile_max_mb', 1024)
+        self.path = None
+        self.lock_file = None
+
+    @property
+    def enabled(self):
+        return bool(self.root)
+
+    def claim_slot(self):
+        """Lock the first free profile slot so concurrent browsers never share a profile"""
+        os.makedirs(self.root, exist_ok=True)
+        for slot in range(64):
+            path = os.path.join(self.root, f"profile-{slot}")
+            if fcntl is None:
+                return path
+            lock_file = open(path + '.lock', 'w')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self.lock_file = lock_file
+            return path
+        raise RuntimeError(f"No free Chrome profile slot in {self.root}")
+
+    def prepare(self):
+        """Claim a slot, clear stale locks and enforce the size limit before a launch"""
+        if self.path is None:
+            self.path = self.claim_slot()
+        os.makedirs(self.path, exist_ok=True)
+
+        for name in STALE_LOCKS:
+            lock_path = os.path.join(self.path, name)
+            if os.path.lexists(lock_path):
+                os.remove(lock_path)
+
+        if self.max_mb:
+            size_mb = dir_size(self.path) / (1024 * 1024)
+            if size_mb > self.max_mb:
+                print(f"♻ Chrome profile is {size_mb:.0f} MB, clearing caches")
+                for name in CACHE_DIRS:
+                    shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+                if dir_size(self.path) / (1024 * 1024) > self.max_mb:
+                    self.reset('still over the size limit')
+
+    def apply(self, options):
+        """Point Chrome options at the managed profile and disk cache"""
+        if not self.enabled:
+            return
+        self.prepare()
+        options.add_argument(f"--user-data-dir={os.path.abspath(self.path)}")
+        options.add_argument(f"--disk-cache-dir={os.path.abspath(os.path.join(self.path, 'DiskCache'))}")
+        options.add_argument(f"--disk-cache-size={int(self.cache_mb * 1024 * 1024)}")
+
+    def reset(self, reason):
+        """Throw the profile away and start from an empty one"""
+        print(f"♻ Resetting Chrome profile {self.path} ({reason})")
+        broken = f"{self.path}.broken-{int(time.time())}"
+        try:
+            os.replace(self.path, broken)
+            shutil.rmtree(broken, ignore_errors=True)
+        except OSError:
+            shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+
+    def launch(self, start):
+        """Start Chrome via start(); if the profile is unusable, reset it and try once more"""
+        try:
+            return start()
+        except Exception as e:
+            if not self.enabled:
+                raise
+            self.reset(f"launch failed: {str(e).splitlines()[0] if str(e) else type(e).__name__}")
+            return start()
@@ -0,0 +1,96 @@
+"""
+Hot-reloadable configuration
+Watches config.json and hands each valid edit to the running monitor or worker, so
+categories, intervals, recipients, parsing, proxies, webhooks, archive and alert rate
+limits change without restarting the browser or session
+"""
+
+import hashlib
+import os
+import time
+
+
+# Settings read once when a monitor or worker starts; edits to them need a restart
+RESTART_KEYS = (
+    'twilio_account_sid', 'twilio_auth_token', 'twilio_whatsapp_from',
+    'read_api_port', 'read_api_host', 'read_api_history_size', 'event_buffer_size',
+    'parse_pool_workers', 'shared_fetch_dir', 'shared_fetch_ttl_seconds', 'alert_workers',
+    'chrome_profile_dir', 'chrome_disk_cache_mb', 'chrome_profile_max_mb', 'driver_max_pages', 'driver_max_rss_mb',
+    'profile_request_path', 'profile_output_dir', 'profile_mode', 'profile_interval_ms',
+    'latency_stats_path', 'latency_window', 'latency_flush_seconds', 'config_poll_seconds',
+    'enrich_cache_path', 'enrich_ttl_seconds', 'enrich_workers',
+    'sitemap_url', 'sitemap_shard_filter', 'sitemap_state_path', 'watch_state_path',
+    'lease_db', 'lease_seconds', 'worker_poll_seconds', 'storage_dir',
+)
+
+
+def warn_restart_keys(old, new):
+    """Warn about edited settings that only take effect after a restart; returns their names"""
+    changed = [key for key in RESTART_KEYS if old.get(key) != new.get(key)]
+    if changed:
+        print(f"⚠ Restart to apply changes to: {', '.join(changed)}")
+    return changed
+
+
+class ConfigWatcher:
+    """Polls a config file and reloads it through `load` when its contents change"""
+
+    def __init__(self, path, load, poll_seconds=5):
+        self.path = path
+        self.load = load
+        self.poll_seconds = poll_seconds
+        self.signature = self.stat()
+        self.digest = self.read_digest()
+
+    def stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def read_digest(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def poll(self):
+        """Return the new config if the file changed since the last poll, else None"""
+        signature = self.stat()
+        if signature == self.signature:
+            return None
+        self.signature = signature
+        digest = self.read_digest()
+        if digest is None or digest == self.digest:
+            return None
+        try:
+            config = self.load(self.path)
+        except Exception as e:
+            # Keep running on the last good config while the file is half-written or invalid
+            print(f"⚠ Ignoring invalid {self.path}: {e}")
+            return None
+        self.digest = digest
+        print(f"✓ Reloaded {self.path}")
+        return config
+
+    def wait(self, interval, apply):
+        """Sleep for interval() seconds, passing config edits to apply() as they appear
+
+        interval is re-read after every poll, so a changed check interval takes effect
+        during the current wait.
+        """
+        started = time.time()
+        while True:
+            remaining = interval() - (time.time() - started)
+            if remaining <= 0:
+                return
+            time.sleep(min(self.poll_seconds, remaining))
+            config = self.poll()
+            if config is not None:
+                try:
+                    apply(config)
+                except ValueError as e:
+                    # e.g. a facet rule that does not compile; the previous extractor stays in use
+                    print(f"⚠ Could not fully apply {self.path}: {e}")
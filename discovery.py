@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Sub-category discovery
+Crawls the configured category pages for sub-category and brand links, dedupes them by
+category ID and hands them to the worker schedule, with depth, size and concurrency
+limits and an on-disk cache so the crawl is not repeated on every check
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse, urlunparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import cloudscraper
+
+from block_detect import check_response
+
+try:
+    import fcntl
+except ImportError:  # Concurrent workers may crawl at the same time on platforms without fcntl
+    fcntl = None
+
+
+HREF_RE = re.compile(r'href=["\']([^"\'#]+)', re.IGNORECASE)
+CATEGORY_PATH_RE = re.compile(r'^/c/[^/]+?-(\d+)/?$')
+BRAND_PATH_RE = re.compile(r'^/(?:b|brand|brands)/([^/]+?)/?$', re.IGNORECASE)
+
+
+def link_key(path):
+    """('c', category_id) or ('b', brand) for a monitorable listing path, else None"""
+    match = CATEGORY_PATH_RE.match(path)
+    if match:
+        return ('c', match.group(1))
+    match = BRAND_PATH_RE.match(path)
+    if match:
+        return ('b', match.group(1).lower())
+    return None
+
+
+def find_listing_links(html, base_url):
+    """Return {key: url} for the sub-category and brand links on a page"""
+    base = urlparse(base_url)
+    links = {}
+    for href in HREF_RE.findall(html or ''):
+        parts = urlparse(urljoin(base_url, href.strip()))
+        if parts.netloc != base.netloc:
+            continue
+        key = link_key(parts.path)
+        if key and key not in links:
+            # Sort orders and filters are the same listing; monitor the bare page
+            links[key] = urlunparse((parts.scheme, parts.netloc, parts.path.rstrip('/'), '', '', ''))
+    return links
+
+
+class DiscoveryCache:
+    """The last crawl result, reused until it is older than `ttl` or the roots change"""
+
+    def __init__(self, path='discovered_categories.json', ttl=86400):
+        self.path = path
+        self.ttl = ttl
+
+    def load(self, roots, stale=False):
+        """Cached categories for the roots; with stale=True an expired result is returned too"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if sorted(data.get('roots', [])) != sorted(roots):
+            return None
+        if not stale and time.time() - data.get('crawled_at', 0) > self.ttl:
+            return None
+        return data['categories']
+
+    def lock(self):
+        """Take the crawl lease without waiting; returns the open lock file, or None if another worker holds it"""
+        lock_file = open(self.path + '.lock', 'w')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def save(self, roots, categories):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'roots': roots, 'crawled_at': time.time(), 'categories': categories}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class CategoryDiscovery:
+    """Breadth-first crawl of listing links below the root categories"""
+
+    def __init__(self, config):
+        self.max_depth = config.get('discover_max_depth', 1)
+        self.max_categories = config.get('discover_max_categories', 50)
+        self.concurrency = config.get('discover_concurrency', 4)
+        self.cache = DiscoveryCache(
+            config.get('discover_cache_path', 'discovered_categories.json'),
+            config.get('discover_cache_ttl_seconds', 86400)
+        )
+        self.local = threading.local()
+        self.stale = False
+
+    def session(self):
+        """One cloudscraper session per crawl thread"""
+        if not hasattr(self.local, 'scraper'):
+            self.local.scraper = cloudscraper.create_scraper(
+                browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
+            )
+        return self.local.scraper
+
+    def fetch_links(self, url):
+        """Listing links on one page; None when the page failed or was a block page"""
+        try:
+            response = self.session().get(url, timeout=30)
+            check_response(response)
+            response.raise_for_status()
+            return find_listing_links(response.text, url)
+        except Exception as e:
+            print(f"✗ Discovery could not read {url}: {e}")
+            return None
+
+    def crawl(self, roots):
+        """Return discovered listing URLs below the roots, excluding the roots themselves
+
+        Returns None when any page could not be read or nothing was found, so a partial
+        or blocked crawl is never mistaken for categories that disappeared.
+        """
+        seen = {}
+        for root in roots:
+            key = link_key(urlparse(root).path.rstrip('/'))
+            seen[key or ('root', root)] = root
+        found = []
+        frontier = list(roots)
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for depth in range(1, self.max_depth + 1):
+                next_frontier = []
+                for links in executor.map(self.fetch_links, frontier):
+                    if links is None:
+                        failed += 1
+                        continue
+                    for key, url in links.items():
+                        if key in seen or len(found) >= self.max_categories:
+                            continue
+                        seen[key] = url
+                        found.append(url)
+                        next_frontier.append(url)
+                print(f"🔎 Discovery depth {depth}: {len(next_frontier)} new listings ({len(found)} total)")
+                if not next_frontier or len(found) >= self.max_categories:
+                    break
+                frontier = next_frontier
+        if failed or not found:
+            print(f"⚠ Discovery incomplete ({failed} pages failed, {len(found)} listings found), not using this crawl")
+            return None
+        return found
+
+    def discover(self, roots, refresh=False):
+        """Cached crawl result for the roots, crawling again when stale or on refresh
+
+        Only the worker holding the crawl lease recrawls; the others, and a failed crawl,
+        fall back to the last good result and set self.stale. Returns None when there is none.
+        """
+        self.stale = False
+        categories = None if refresh else self.cache.load(roots)
+        if categories is not None:
+            return categories
+
+        lock_file = self.cache.lock()
+        if lock_file is None:
+            print("🔎 Another worker is crawling categories, using the last result")
+            self.stale = True
+            return self.cache.load(roots, stale=True)
+        try:
+            # The worker that held the lease before may have just refreshed the cache
+            categories = None if refresh else self.cache.load(roots)
+            if categories is None:
+                categories = self.crawl(roots)
+                if categories is None:
+                    self.stale = True
+                    return self.cache.load(roots, stale=True)
+                self.cache.save(roots, categories)
+            return categories
+        finally:
+            lock_file.close()
+
+
+def main():
+    """Command line entry point: discovery.py [config.json] -- recrawl and list discovered categories"""
+    from worker import configured_checks
+
+    config_path = sys.argv[1] if len(sys.argv) > 1 else 'config.json'
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    categories = CategoryDiscovery(config).discover(list(configured_checks(config)), refresh=True)
+    if categories is None:
+        sys.exit(1)
+    for url in categories:
+        print(url)
+
+
+if __name__ == '__main__':
+    main()
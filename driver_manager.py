@@ -0,0 +1,96 @@
+"""
+Chrome driver lifecycle management
+Recycles the browser after a number of pages or when its memory grows too large,
+and transparently replaces dead sessions so scheduled checks keep running
+"""
+
+try:
+    import psutil
+except ImportError:  # RSS watchdog is disabled without psutil
+    psutil = None
+
+
+class DriverManager:
+    """Owns the WebDriver instance created by a monitor's setup_driver()"""
+
+    def __init__(self, factory, config):
+        self.factory = factory
+        self.max_pages = config.get('driver_max_pages', 200)
+        self.max_rss_mb = config.get('driver_max_rss_mb', 1500)
+        self.driver = None
+        self.pages = 0
+        self.recycles = 0
+
+    def start(self):
+        """Start a fresh browser"""
+        self.driver = self.factory()
+        self.pages = 0
+        return self.driver
+
+    def quit(self):
+        """Close the browser, ignoring errors from sessions that already died"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+    def recycle(self, reason):
+        """Replace the browser with a fresh one"""
+        print(f"♻ Recycling Chrome driver ({reason})")
+        self.quit()
+        self.recycles += 1
+        return self.start()
+
+    def is_alive(self):
+        """Whether the browser still answers WebDriver commands"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def rss_mb(self):
+        """Resident memory of chromedriver and all Chrome processes it started, in MB"""
+        if psutil is None or not self.driver:
+            return None
+        try:
+            process = psutil.Process(self.driver.service.process.pid)
+            total = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total / (1024 * 1024)
+        except (AttributeError, psutil.Error):
+            return None
+
+    def ensure(self):
+        """Return a healthy driver, recycling it if it is dead, worn out or too large"""
+        if not self.driver:
+            return self.start()
+        if not self.is_alive():
+            return self.recycle('session is dead')
+        if self.max_pages and self.pages >= self.max_pages:
+            return self.recycle(f"{self.pages} pages loaded")
+        rss = self.rss_mb()
+        if self.max_rss_mb and rss is not None and rss > self.max_rss_mb:
+            return self.recycle(f"RSS {rss:.0f} MB")
+        return self.driver
+
+    def run(self, action):
+        """Run a page action, retrying once on a fresh browser if the session died during it"""
+        self.ensure()
+        try:
+            return action()
+        except Exception:
+            if self.is_alive():
+                raise
+            self.recycle('session died during check')
+            return action()
+        finally:
+            self.pages += 1
@@ -0,0 +1,211 @@
+"""
+Product-detail enrichment
+Fetches detail pages for new or watched products with bounded concurrency to learn
+size-level stock, backed by an on-disk TTL cache keyed by product ID and ETag, and
+remembers the sizes of watched products to report restocks and size changes
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+import threading
+import time
+
+import cloudscraper
+
+from block_detect import PageBlocked, check_response
+
+
+JSON_LD_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+SIZE_BUTTON_RE = re.compile(r'<[^>]+class="([^"]*size[^"]*)"[^>]*>\s*([^<]{1,12}?)\s*<', re.IGNORECASE)
+UNAVAILABLE_CLASS_RE = re.compile(r'disabled|sold-?out|unavailable|out-of-stock', re.IGNORECASE)
+
+
+def parse_detail(html):
+    """Return the in-stock sizes found on a product detail page"""
+    sizes = []
+
+    # Structured data: schema.org offers carry availability per size
+    for block in JSON_LD_RE.findall(html):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        for item in data if isinstance(data, list) else [data]:
+            if not isinstance(item, dict):
+                continue
+            offers = item.get('offers', [])
+            for offer in offers if isinstance(offers, list) else [offers]:
+                if not isinstance(offer, dict) or not str(offer.get('availability', '')).endswith('InStock'):
+                    continue
+                size = offer.get('size') or offer.get('name')
+                if size and size not in sizes:
+                    sizes.append(size)
+    if sizes:
+        return sizes
+
+    # Fallback: size selector buttons that are not disabled or sold out
+    for classes, label in SIZE_BUTTON_RE.findall(html):
+        if not UNAVAILABLE_CLASS_RE.search(classes) and label not in sizes:
+            sizes.append(label)
+    return sizes
+
+
+class DetailCache:
+    """Product details on disk, each entry valid for `ttl` seconds and revalidated by ETag"""
+
+    def __init__(self, path='product_details.json', ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠ Ignoring unreadable detail cache {path}")
+
+    def get(self, product_id):
+        with self.lock:
+            return self.entries.get(product_id)
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry['fetched_at'] < self.ttl
+
+    def put(self, product_id, entry):
+        with self.lock:
+            self.entries[product_id] = entry
+
+    def save(self):
+        """Write the cache atomically, dropping entries that are long expired"""
+        cutoff = time.time() - self.ttl * 24
+        with self.lock:
+            self.entries = {k: v for k, v in self.entries.items() if v['fetched_at'] >= cutoff}
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+
+
+class ProductEnricher:
+    """Adds `sizes` and `in_stock` to product records from their detail pages"""
+
+    def __init__(self, config):
+        self.cache = DetailCache(
+            config.get('enrich_cache_path', 'product_details.json'),
+            config.get('enrich_ttl_seconds', 3600)
+        )
+        self.workers = config.get('enrich_workers', 4)
+        self.local = threading.local()
+
+    def session(self):
+        """One cloudscraper session per worker thread"""
+        if not hasattr(self.local, 'scraper'):
+            self.local.scraper = cloudscraper.create_scraper(
+                browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
+            )
+        return self.local.scraper
+
+    def fetch(self, product):
+        """Return fresh details for one product, using the cache and ETag revalidation
+
+        Returns None for a challenge or block page, so the product keeps its last known sizes.
+        """
+        entry = self.cache.get(product['id'])
+        if self.cache.is_fresh(entry):
+            return entry
+
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        response = self.session().get(product['url'], headers=headers, timeout=30)
+
+        if response.status_code == 304 and entry:
+            entry = dict(entry, fetched_at=time.time())
+        else:
+            try:
+                check_response(response)
+            except PageBlocked as e:
+                # A block page lists no sizes; never record it as sold out
+                print(f"🛡 Got a {e} for product {product['id']}, keeping its last known sizes")
+                return None
+            response.raise_for_status()
+            sizes = parse_detail(response.text)
+            entry = {
+                'etag': response.headers.get('ETag'),
+                'fetched_at': time.time(),
+                'sizes': sizes,
+                'in_stock': bool(sizes),
+            }
+        self.cache.put(product['id'], entry)
+        return entry
+
+    def enrich(self, products):
+        """Fetch details for the given products concurrently and attach them in place"""
+        if not products:
+            return products
+        hits = sum(1 for p in products if self.cache.is_fresh(self.cache.get(p['id'])))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self._fetch_safe, products))
+        for product, entry in zip(products, results):
+            if entry is not None:
+                product['sizes'] = entry['sizes']
+                product['in_stock'] = entry['in_stock']
+        self.cache.save()
+        print(f"✓ Enriched {len(products)} products ({hits} from cache)")
+        return products
+
+    def _fetch_safe(self, product):
+        try:
+            return self.fetch(product)
+        except Exception as e:
+            print(f"✗ Failed to fetch details for product {product['id']}: {e}")
+            return None
+
+
+class StockWatch:
+    """Last known sizes of watched products, kept on disk so restocks are noticed across restarts"""
+
+    def __init__(self, path='watched_products.json'):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠ Ignoring unreadable watch state {path}")
+
+    def get(self, product_id):
+        return self.entries.get(str(product_id))
+
+    def update(self, products):
+        """Record the enriched sizes of watched products
+
+        Returns [(product, old_sizes, new_sizes)] for every product whose in-stock sizes
+        changed since the last check; the first sighting of a product is only recorded.
+        """
+        changes = []
+        for product in products:
+            if 'sizes' not in product:
+                # Enrichment failed; keep the last known state
+                continue
+            previous = self.get(product['id'])
+            sizes = list(product['sizes'])
+            self.entries[product['id']] = {
+                'name': product['name'],
+                'url': product['url'],
+                'sizes': sizes,
+                'in_stock': bool(sizes),
+                'checked_at': time.time(),
+            }
+            if previous is not None and set(previous['sizes']) != set(sizes):
+                changes.append((product, previous['sizes'], sizes))
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+        return changes
@@ -0,0 +1,146 @@
+"""
+Change-event stream
+An in-process event bus with a bounded replay buffer, consumed by the SSE endpoint of
+the read API and by outbound webhook senders, without blocking the monitoring loop
+"""
+
+from collections import deque
+from datetime import datetime
+import heapq
+import json
+import threading
+import time
+import urllib.request
+
+from product_record import json_default
+
+
+class EventBus:
+    """Publishes numbered events and keeps the last `buffer_size` for replay"""
+
+    def __init__(self, buffer_size=1000):
+        self.buffer = deque(maxlen=buffer_size)
+        self.last_id = 0
+        self.condition = threading.Condition()
+
+    def publish(self, event_type, data):
+        """Append an event and wake every waiting subscriber; never blocks on consumers"""
+        with self.condition:
+            self.last_id += 1
+            event = {
+                'id': self.last_id,
+                'type': event_type,
+                'time': datetime.utcnow().isoformat() + 'Z',
+                'data': data,
+            }
+            self.buffer.append(event)
+            self.condition.notify_all()
+        return event
+
+    def since(self, cursor):
+        """Return (events after cursor, missed) where missed is True if the cursor fell out of the buffer"""
+        with self.condition:
+            return self._since(cursor)
+
+    def _since(self, cursor):
+        if not self.buffer:
+            return [], False
+        missed = cursor < self.buffer[0]['id'] - 1
+        return [e for e in self.buffer if e['id'] > cursor], missed
+
+    def wait_since(self, cursor, timeout=15):
+        """Like since(), but wait up to `timeout` seconds for a new event"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.last_id > cursor, timeout=timeout)
+            return self._since(cursor)
+
+
+class WebhookSender:
+    """Delivers bus events to one webhook URL from its own thread, retrying with backoff
+
+    Failed events wait in a retry queue for their backoff to pass while later events
+    are still delivered, so one bad event never holds up the rest. Retried events may
+    therefore arrive out of order; receivers can order them by X-Event-Id.
+    """
+
+    def __init__(self, bus, url, retries=5, timeout=10, max_pending=1000):
+        self.bus = bus
+        self.url = url
+        self.retries = retries
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = []  # heap of (due time, event id, attempt, event)
+        self.cursor = bus.last_id
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop delivering after the current event (the webhook was removed from the config)"""
+        self.stopped = True
+
+    def post(self, event):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(event, default=json_default).encode('utf-8'),
+            headers={'Content-Type': 'application/json', 'X-Event-Id': str(event['id'])},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+    def deliver(self, event, attempt=0):
+        """Post one event; on failure queue it for another attempt after its backoff"""
+        try:
+            self.post(event)
+            return
+        except Exception as e:
+            error = e
+        if attempt == self.retries:
+            print(f"✗ Webhook {self.url} dropped event {event['id']}: {error}")
+        elif len(self.pending) >= self.max_pending:
+            print(f"✗ Webhook {self.url} dropped event {event['id']}, {len(self.pending)} events already waiting to retry")
+        else:
+            heapq.heappush(self.pending, (time.time() + min(2 ** attempt, 60), event['id'], attempt + 1, event))
+
+    def retry_due(self):
+        """Retry the queued events whose backoff has passed"""
+        now = time.time()
+        while self.pending and self.pending[0][0] <= now and not self.stopped:
+            _, _, attempt, event = heapq.heappop(self.pending)
+            self.deliver(event, attempt)
+
+    def run(self):
+        while not self.stopped:
+            # Wake up for new events or for the next retry, whichever comes first
+            timeout = max(0, self.pending[0][0] - time.time()) if self.pending else 60
+            events, missed = self.bus.wait_since(self.cursor, timeout=timeout)
+            if missed:
+                print(f"⚠ Webhook {self.url} fell behind, skipped to event {events[0]['id']}")
+            for event in events:
+                if self.stopped:
+                    return
+                self.deliver(event)
+                self.cursor = event['id']
+            self.retry_due()
+
+
+_bus = None
+_webhooks = {}
+
+
+def get_event_bus(config):
+    """Return the process-wide event bus, starting configured webhook senders once
+
+    Called again with a reloaded config, it starts new webhooks and stops removed ones.
+    """
+    global _bus
+    if _bus is None:
+        _bus = EventBus(config.get('event_buffer_size', 1000))
+    webhooks = config.get('webhooks', [])
+    for url in webhooks:
+        if url not in _webhooks:
+            _webhooks[url] = WebhookSender(_bus, url)
+    for url in [url for url in _webhooks if url not in webhooks]:
+        _webhooks.pop(url).stop()
+    return _bus
@@ -0,0 +1,107 @@
+"""
+Declarative facet-count extraction
+The built-in total and gender patterns and the facet rules from config.json are compiled
+once into a single regex, so every count (total, men, women, size, colour, brand, price
+band, ...) is found in one pass over the page text
+"""
+
+import re
+
+
+COUNT = r'\d{1,3}(?:,\d{3})*'
+# Between a facet label and its count: whitespace or markup, then "(1,234)"
+LABEL_COUNT_GAP = r'(?:\s|<[^>]*>)*\(\s*'
+
+# Counts every page extractor reads from the raw text: (key, text before the count, text after it)
+BUILTIN_RULES = (
+    ('total', '', r'\s*(?:products|items)'),
+    ('women', r'Women[^\d]*\(', r'\)'),
+    ('men', r'Men[^\d]*\(', r'\)'),
+)
+
+
+def compile_label_pattern(i, rule):
+    """Return the label regex for one facet rule, raising ValueError for a rule that cannot be used"""
+    if not rule.get('facet'):
+        raise ValueError(f"facet_rules[{i}] has no facet name")
+    if 'pattern' in rule:
+        label_pattern = rule['pattern']
+        try:
+            compiled = re.compile(f"(?:{label_pattern})")
+        except re.error as e:
+            raise ValueError(f"facet_rules[{i}] ({rule['facet']}): invalid pattern: {e}")
+        # Named groups would collide with the ones the combined regex uses to report matches
+        if compiled.groupindex:
+            names = ', '.join(compiled.groupindex)
+            raise ValueError(f"facet_rules[{i}] ({rule['facet']}): pattern must not define named groups ({names}), use (?:...)")
+    elif rule.get('labels'):
+        labels = sorted(rule['labels'], key=len, reverse=True)
+        label_pattern = '|'.join(re.escape(label) for label in labels)
+    else:
+        raise ValueError(f"facet_rules[{i}] ({rule['facet']}) needs labels or a pattern")
+    if rule.get('ignore_case'):
+        label_pattern = f"(?i:{label_pattern})"
+    return label_pattern
+
+
+def compile_facet_rules(rules=(), builtin=True):
+    """Compile facet rules, and with builtin the total and gender patterns, into a FacetExtractor.
+
+    Each rule has a `facet` name and either a list of `labels` or a regex `pattern`
+    matching the label text, and may set `ignore_case`; `key` is a template for the
+    counts key (default "{facet}:{label}", "{label_lower}" is also available). Counts
+    follow the label as "Label (1,234)", optionally separated by markup. Raises
+    ValueError for a rule that cannot be compiled.
+    """
+    alternatives = []
+    groups = {}
+    if builtin:
+        for key, before, after in BUILTIN_RULES:
+            group = f"c_{key}"
+            alternatives.append(f"(?i:{before}(?P<{group}>{COUNT}){after})")
+            groups[group] = (key, None, None)
+    for i, rule in enumerate(rules or ()):
+        label_pattern = compile_label_pattern(i, rule)
+        alternatives.append(rf"(?<![\w])(?P<l{i}>{label_pattern}){LABEL_COUNT_GAP}(?P<c{i}>{COUNT})\s*\)")
+        groups[f"c{i}"] = (rule.get('key', '{facet}:{label}'), rule['facet'], f"l{i}")
+    return FacetExtractor(re.compile('|'.join(alternatives) or r'(?!)'), groups)
+
+
+class FacetExtractor:
+    """Counts every compiled pattern in a single scan of the page text"""
+
+    def __init__(self, regex, groups):
+        self.regex = regex
+        self.groups = groups
+
+    def scan(self, html):
+        """Return {key: count} for the first occurrence of each count"""
+        counts = {}
+        for match in self.regex.finditer(html or ''):
+            # The count group closes last, so it names the rule that matched
+            group = match.lastgroup
+            template, facet, label_group = self.groups[group]
+            if label_group is None:
+                key = template
+            else:
+                label = match.group(label_group).strip()
+                key = template.format(facet=facet, label=label, label_lower=label.lower())
+            if key not in counts:
+                counts[key] = int(match.group(group).replace(',', ''))
+        return counts
+
+
+# The total and gender counts alone, for extractors run without facet rules
+TEXT_COUNTS = compile_facet_rules()
+
+
+def format_facet_changes(counts, changes):
+    """Format changed facet counts (keys like "size:M") as alert lines"""
+    lines = ''
+    for key in sorted(k for k in (changes or {}) if ':' in k):
+        facet, label = key.split(':', 1)
+        value = counts.get(key, 0)
+        diff = changes[key]['diff']
+        sign = '+' if diff > 0 else ''
+        lines += f"{facet.capitalize()} {label}: {value:,} ({sign}{diff:,})\n"
+    return lines
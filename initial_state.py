@@ -0,0 +1,169 @@
+"""
+Embedded __INITIAL_STATE__ extraction
+Finds the `__INITIAL_STATE__` assignment in a page and walks the embedded JSON with a
+bracket-aware scanner, decoding only the product list, facet counts and totals
+instead of the whole state object
+"""
+
+from collections import deque
+import json
+import re
+
+
+STATE_RE = re.compile(r'__INITIAL_STATE__\s*=\s*')
+JSON_PARSE_RE = re.compile(r'JSON\.parse\(\s*(["\'])')
+STRUCT_RE = re.compile(r'[{}\[\]",]')
+STRING_END_RE = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+WHITESPACE_RE = re.compile(r'\s*')
+
+PRODUCT_KEYS = ('products',)
+TOTAL_KEYS = ('totalResults', 'totalCount', 'totalNumberOfResults', 'total', 'numFound')
+FACET_KEYS = ('facets', 'filters')
+FACET_NAME_KEYS = ('name', 'displayName', 'label', 'value')
+FACET_COUNT_KEYS = ('count', 'productCount', 'num')
+
+_decoder = json.JSONDecoder()
+
+
+def find_state(html):
+    """Return (text, start) where the state's JSON object begins, or (None, None)"""
+    match = STATE_RE.search(html or '')
+    if not match:
+        return None, None
+    start = match.end()
+    if html.startswith('{', start):
+        return html, start
+
+    # JSON.parse("...") form: unescape the JS string literal first
+    quoted = JSON_PARSE_RE.match(html, start)
+    if quoted and quoted.group(1) == '"':
+        try:
+            literal, _ = _decoder.raw_decode(html, quoted.end() - 1)
+        except ValueError:
+            return None, None
+        return literal, WHITESPACE_RE.match(literal).end()
+    return None, None
+
+
+def scan_keys(text, start, wanted):
+    """Yield (key, value, depth, parent) for every object member named in `wanted`
+
+    parent is the offset of the enclosing object, so members of the same object can
+    be told apart from equally named members elsewhere in the state.
+
+    Only the wanted values are decoded; everything else is skipped with regex jumps
+    from one structural character to the next, so strings containing brackets or
+    `};` never confuse the scan.
+    """
+    stack = []
+    pos = start
+    expect_key = False
+    while True:
+        match = STRUCT_RE.search(text, pos)
+        if match is None:
+            return
+        char, i = match.group(), match.start()
+
+        if char == '"':
+            end = STRING_END_RE.match(text, i + 1)
+            if end is None:
+                return
+            end = end.end()
+            if expect_key and stack and stack[-1][0] == '{':
+                expect_key = False
+                colon = WHITESPACE_RE.match(text, end).end()
+                if colon >= len(text) or text[colon] != ':':
+                    pos = end
+                    continue
+                key = json.loads(text[i:end])
+                value_start = WHITESPACE_RE.match(text, colon + 1).end()
+                if key in wanted:
+                    try:
+                        value, value_end = _decoder.raw_decode(text, value_start)
+                    except ValueError:
+                        pos = value_start
+                        continue
+                    yield key, value, len(stack), stack[-1][1]
+                    pos = value_end
+                    continue
+                pos = value_start
+                continue
+            pos = end
+            continue
+
+        if char in '{[':
+            stack.append((char, i))
+            expect_key = char == '{'
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            if not stack:
+                return
+        elif char == ',':
+            expect_key = bool(stack) and stack[-1][0] == '{'
+        pos = i + 1
+
+
+def facet_values(facets):
+    """Flatten facet structures into {value name: count}"""
+    values = {}
+    pending = deque([facets])
+    while pending:
+        item = pending.popleft()
+        if isinstance(item, list):
+            pending.extend(item)
+        elif isinstance(item, dict):
+            name = next((item[k] for k in FACET_NAME_KEYS if isinstance(item.get(k), str)), None)
+            count = next((item[k] for k in FACET_COUNT_KEYS if isinstance(item.get(k), int)), None)
+            if name is not None and count is not None:
+                values.setdefault(name.strip(), count)
+            pending.extend(v for v in item.values() if isinstance(v, (list, dict)))
+    return values
+
+
+def extract_state(html):
+    """Return {'products': [...], 'total': int, 'facets': {name: count}} from the page state, or None"""
+    text, start = find_state(html)
+    if text is None:
+        return None
+
+    state = {'products': None, 'total': None, 'facets': {}}
+    product_depth = product_parent = None
+    totals = {}
+    for key, value, depth, parent in scan_keys(text, start, PRODUCT_KEYS + TOTAL_KEYS + FACET_KEYS):
+        # The shallowest product list wins
+        if key in PRODUCT_KEYS and isinstance(value, list):
+            if product_depth is None or depth < product_depth:
+                state['products'], product_depth, product_parent = value, depth, parent
+        elif key in TOTAL_KEYS and isinstance(value, int) and not isinstance(value, bool):
+            totals.setdefault(parent, {}).setdefault(key, value)
+        elif key in FACET_KEYS:
+            for name, count in facet_values(value).items():
+                state['facets'].setdefault(name, count)
+
+    # Only a total next to the product list counts; a bare `total` elsewhere may be a cart
+    siblings = totals.get(product_parent, {}) if product_parent is not None else {}
+    state['total'] = next((siblings[key] for key in TOTAL_KEYS if key in siblings), None)
+    return state
+
+
+def extract_state_counts(html, text_total=None):
+    """Counts ({'total', 'men', 'women'}) from the embedded state; empty if the page has none
+
+    The product list only holds the first page, so its length is used as the total only
+    when neither the state nor the page text (text_total) gives one.
+    """
+    state = extract_state(html)
+    if state is None:
+        return {}
+    counts = {}
+    if state['total'] is not None:
+        counts['total'] = state['total']
+    elif text_total is not None:
+        counts['total'] = text_total
+    elif state['products'] is not None:
+        counts['total'] = len(state['products'])
+    for name, count in state['facets'].items():
+        if name.lower() in ('men', 'women'):
+            counts[name.lower()] = count
+    return counts
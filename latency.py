@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Detection-latency tracking
+Timestamps every stage of a check (fetch, diff, enrichment, outbox, provider acceptance)
+and keeps rolling latency percentiles per category and fetch strategy, so slow strategies
+and intervals show up in numbers rather than guesses
+"""
+
+from collections import deque
+from datetime import datetime
+import atexit
+import json
+import os
+import sys
+import time
+
+
+# (name, from stages, to stage) for the per-check durations; the first from stage the
+# check reached is used, so the outbox stage never includes enrichment
+STAGES = (
+    ('fetch', ('started',), 'fetched'),
+    ('diff', ('fetched',), 'diffed'),
+    ('enrich', ('diffed',), 'enriched'),
+    ('outbox', ('enriched', 'diffed'), 'queued'),
+    ('send', ('queued',), 'accepted'),
+)
+
+
+def to_epoch(value):
+    """Accept epoch seconds or an ISO 8601 timestamp; None if it cannot be read"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def percentiles(values):
+    """p50/p90/p99/max of a list of seconds, rounded for display"""
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        'count': len(ordered),
+        'p50': round(pick(0.50), 3),
+        'p90': round(pick(0.90), 3),
+        'p99': round(pick(0.99), 3),
+        'max': round(ordered[-1], 3),
+    }
+
+
+class LatencyTracker:
+    """Rolling stage and detection latencies per (category URL, strategy)"""
+
+    def __init__(self, config):
+        self.path = config.get('latency_stats_path', 'latency_stats.json')
+        self.window = config.get('latency_window', 500)
+        self.flush_seconds = config.get('latency_flush_seconds', 60)
+        self.samples = {}
+        self.stages = {}
+        self.dirty = False
+        self.flushed_at = time.time()
+        self.load()
+        atexit.register(self.flush)
+
+    def load(self):
+        """Pick up the samples kept by previous runs"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f).get('samples', {})
+        except (OSError, ValueError):
+            return
+        for url, strategies in stored.items():
+            for strategy, metrics in strategies.items():
+                for metric, values in metrics.items():
+                    self.series(url, strategy, metric).extend(values)
+
+    def series(self, url, strategy, metric):
+        by_strategy = self.samples.setdefault(url, {}).setdefault(strategy, {})
+        return by_strategy.setdefault(metric, deque(maxlen=self.window))
+
+    def begin(self):
+        """Start timing a new check"""
+        self.stages = {'started': time.time()}
+
+    def mark(self, stage):
+        """Timestamp a stage of the current check (fetched, diffed, queued, accepted)"""
+        self.stages[stage] = time.time()
+        return self.stages[stage]
+
+    def record(self, url, strategy, seen_at=None, listed_at=()):
+        """Record the accepted alerts of the current check; call once per check
+
+        seen_at lists when each alerted item was first fetched (the check's fetch time by
+        default); listed_at lists when each item was listed, where known. Samples are
+        written to disk every latency_flush_seconds rather than on every check.
+        """
+        accepted = self.stages.get('accepted')
+        if accepted is None:
+            return
+        for name, starts, end in STAGES:
+            start = next((stage for stage in starts if stage in self.stages), None)
+            if start is not None and end in self.stages:
+                self.series(url, strategy, name).append(self.stages[end] - self.stages[start])
+        for seen in seen_at or [self.stages.get('fetched', self.stages['started'])]:
+            self.series(url, strategy, 'since_seen').append(accepted - seen)
+        for listed in listed_at:
+            listed = to_epoch(listed)
+            if listed is not None:
+                self.series(url, strategy, 'since_listed').append(accepted - listed)
+        self.dirty = True
+
+        stats = percentiles(self.series(url, strategy, 'since_seen'))
+        print(f"⏱ Detection latency for {strategy}: p50 {stats['p50']}s, p90 {stats['p90']}s over {stats['count']} detections")
+        if time.time() - self.flushed_at >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Write the samples if any were recorded since the last write"""
+        if self.dirty:
+            self.save()
+
+    def summary(self):
+        """{url: {strategy: {metric: percentiles}}}"""
+        return {
+            url: {
+                strategy: {metric: percentiles(values) for metric, values in metrics.items() if values}
+                for strategy, metrics in strategies.items()
+            }
+            for url, strategies in self.samples.items()
+        }
+
+    def save(self):
+        self.dirty = False
+        self.flushed_at = time.time()
+        if not self.path:
+            return
+        data = {
+            'updated_at': datetime.utcnow().isoformat() + 'Z',
+            'summary': self.summary(),
+            'samples': {
+                url: {
+                    strategy: {metric: [round(v, 3) for v in values] for metric, values in metrics.items()}
+                    for strategy, metrics in strategies.items()
+                }
+                for url, strategies in self.samples.items()
+            },
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+
+def main():
+    """Print the latency percentiles table: latency.py [latency_stats.json]"""
+    path = sys.argv[1] if len(sys.argv) > 1 else 'latency_stats.json'
+    with open(path, 'r') as f:
+        summary = json.load(f)['summary']
+    for url, strategies in summary.items():
+        print(url)
+        for strategy, metrics in strategies.items():
+            print(f"  {strategy}")
+            for metric, stats in metrics.items():
+                print(f"    {metric:<13} n={stats['count']:<5} p50 {stats['p50']:>8}s  p90 {stats['p90']:>8}s  "
+                      f"p99 {stats['p99']:>8}s  max {stats['max']:>8}s")
+
+
+if __name__ == '__main__':
+    main()
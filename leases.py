@@ -0,0 +1,191 @@
+"""
+Lease-based coordination for monitor workers
+Worker processes on one host share a SQLite database (WAL mode, so it must live on a
+local filesystem, not a network share) and claim due category checks through expiring,
+fenced leases, so every check runs once and a crashed worker's checks are picked up by
+the others
+"""
+
+import sqlite3
+import time
+
+
+ALERT_RETENTION_SECONDS = 7 * 24 * 3600
+ALERT_MAX_ATTEMPTS = 5
+
+CHECKS_TABLE = '''
+CREATE TABLE IF NOT EXISTS checks (
+    url TEXT PRIMARY KEY,
+    interval_seconds REAL NOT NULL,
+    next_due REAL NOT NULL,
+    owner TEXT,
+    token INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL NOT NULL DEFAULT 0
+)
+'''
+
+ALERTS_TABLE = '''
+CREATE TABLE IF NOT EXISTS alerts (
+    url TEXT NOT NULL,
+    token INTEGER NOT NULL,
+    recipient TEXT NOT NULL DEFAULT '',
+    message TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (url, token, recipient)
+)
+'''
+
+
+class LeaseStore:
+    """Check schedule and leases stored in a shared SQLite database"""
+
+    def __init__(self, db_path='leases.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.create_tables()
+
+    def _transaction(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+
+    def create_tables(self):
+        """Create the schedule and alert outbox tables if they do not exist yet"""
+        self.conn.execute(CHECKS_TABLE)
+        self.conn.execute(ALERTS_TABLE)
+
+    def close(self):
+        self.conn.close()
+
+    def register(self, intervals, retire=True):
+        """Schedule the given {url: interval_seconds} checks and, with retire, remove any others"""
+        now = time.time()
+        self._transaction()
+        try:
+            for url, interval in intervals.items():
+                self.conn.execute(
+                    'INSERT INTO checks (url, interval_seconds, next_due) VALUES (?, ?, ?) '
+                    'ON CONFLICT(url) DO UPDATE SET interval_seconds = excluded.interval_seconds',
+                    (url, interval, now)
+                )
+            if retire:
+                placeholders = ','.join('?' * len(intervals))
+                self.conn.execute(f'DELETE FROM checks WHERE url NOT IN ({placeholders})', list(intervals))
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def claim(self, worker_id, lease_seconds):
+        """Lease the most overdue free check; returns (url, token) or None"""
+        now = time.time()
+        self._transaction()
+        try:
+            row = self.conn.execute(
+                'SELECT url, token FROM checks WHERE next_due <= ? AND lease_expires <= ? '
+                'ORDER BY next_due LIMIT 1',
+                (now, now)
+            ).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            # Tokens only grow, even if a URL is retired and registered again
+            url, token = row[0], max(row[1] + 1, int(now * 1000))
+            self.conn.execute(
+                'UPDATE checks SET owner = ?, token = ?, lease_expires = ? WHERE url = ?',
+                (worker_id, token, now + lease_seconds, url)
+            )
+            self.conn.execute('COMMIT')
+            return url, token
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def holds(self, url, token):
+        """Whether the lease identified by token is still the current, unexpired one"""
+        row = self.conn.execute(
+            'SELECT token, lease_expires FROM checks WHERE url = ?', (url,)
+        ).fetchone()
+        return row is not None and row[0] == token and row[1] > time.time()
+
+    def renew(self, url, token, lease_seconds):
+        """Extend a lease that is still held; returns False if it was lost"""
+        now = time.time()
+        cursor = self.conn.execute(
+            'UPDATE checks SET lease_expires = ? WHERE url = ? AND token = ? AND lease_expires > ?',
+            (now + lease_seconds, url, token, now)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, url, token):
+        """Release a lease and schedule the next check; ignored if the lease was lost"""
+        cursor = self.conn.execute(
+            'UPDATE checks SET owner = NULL, lease_expires = 0, next_due = ? + interval_seconds '
+            'WHERE url = ? AND token = ?',
+            (time.time(), url, token)
+        )
+        return cursor.rowcount == 1
+
+    def commit(self, url, token, alerts, write=None):
+        """Queue alerts and run write() (the state save) in one transaction, if the lease is still held
+
+        alerts is a list of (recipient, message). The database write lock is held while
+        write() runs, so a worker whose lease was taken over can never save after the new
+        holder. Returns False, writing nothing, when the lease was lost.
+        """
+        now = time.time()
+        self._transaction()
+        try:
+            row = self.conn.execute(
+                'SELECT 1 FROM checks WHERE url = ? AND token = ? AND lease_expires > ?',
+                (url, token, now)
+            ).fetchone()
+            if row is None:
+                self.conn.execute('ROLLBACK')
+                return False
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO alerts (url, token, recipient, message, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(url, token, recipient, message, now) for recipient, message in alerts]
+            )
+            if write is not None:
+                write()
+            self.conn.execute(
+                'DELETE FROM alerts WHERE COALESCE(sent_at, created_at) < ?', (now - ALERT_RETENTION_SECONDS,)
+            )
+            self.conn.execute('COMMIT')
+            return True
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def pending_alerts(self, url):
+        """Committed but undelivered alerts for a category as (token, recipient, message), oldest first"""
+        return self.conn.execute(
+            'SELECT token, recipient, message FROM alerts WHERE url = ? AND sent_at IS NULL '
+            'ORDER BY created_at, token',
+            (url,)
+        ).fetchall()
+
+    def finish_alert(self, url, token, recipient, sent):
+        """Mark an alert delivered, or count a failed attempt and give up after ALERT_MAX_ATTEMPTS"""
+        if sent:
+            self.conn.execute(
+                'UPDATE alerts SET sent_at = ? WHERE url = ? AND token = ? AND recipient = ?',
+                (time.time(), url, token, recipient)
+            )
+            return
+        self.conn.execute(
+            'UPDATE alerts SET attempts = attempts + 1 WHERE url = ? AND token = ? AND recipient = ?',
+            (url, token, recipient)
+        )
+        self.conn.execute(
+            'DELETE FROM alerts WHERE url = ? AND sent_at IS NULL AND attempts >= ?', (url, ALERT_MAX_ATTEMPTS)
+        )
+
+    def next_due_in(self):
+        """Seconds until the next check becomes claimable, or None if nothing is scheduled"""
+        row = self.conn.execute('SELECT MIN(MAX(next_due, lease_expires)) FROM checks').fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
@@ -14,10 +14,27 @@ from bs4 import BeautifulSoup
 import json
 import time
 from datetime import datetime
+from functools import partial
 from twilio.rest import Client
 import os
 import re
 
+from parse_pool import get_parse_pool
+from driver_manager import DriverManager
+from chrome_profile import ChromeProfile
+from facets import TEXT_COUNTS, compile_facet_rules, format_facet_changes
+from alerts import AlertSender
+from archive import PageArchive
+from block_detect import BlockStats, PageBlocked, check_driver, check_html
+from profiler import CheckProfiler
+from read_api import start_read_api
+from events import get_event_bus
+from config_watch import ConfigWatcher, warn_restart_keys
+from latency import LatencyTracker
+from shared_fetch import get_shared_fetch
+from targeted_parse import extract_filter_counts
+from browser_extract import extract_counts_in_browser
+
 
 class SheinMonitor:
     def __init__(self, config_path='config.json'):
@@ -26,6 +43,32 @@ class SheinMonitor:
         self.storage_path = self.config.get('storage_path', 'product_counts.json')
         self.url = self.config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')
         self.check_interval = self.config.get('check_interval_seconds', 300)
+        self.config_watcher = ConfigWatcher(config_path, self.load_config, self.config.get('config_poll_seconds', 5))
+        self.profiler = CheckProfiler(self.config)
+        self.block_stats = BlockStats()
+        self.latency = LatencyTracker(self.config)
+        
+        # Change events for SSE clients and webhooks
+        self.events = get_event_bus(self.config)
+        
+        # Optional local read API serving the latest state from memory
+        self.read_api = None
+        if self.config.get('read_api_port'):
+            self.read_api = start_read_api(
+                self.config['read_api_port'],
+                self.config.get('read_api_host', '127.0.0.1'),
+                self.config.get('read_api_history_size', 500),
+                self.events
+            )
+            stored_data = self.load_stored_counts()
+            if stored_data:
+                self.read_api.update_counts(self.url, stored_data['counts'], stored_data['timestamp'])
+        self.parse_pool = get_parse_pool(self.config.get('parse_pool_workers', 0))
+        self.shared_fetch = get_shared_fetch(self.config)
+        
+        # Page archive and extractor are re-applied when config.json changes
+        self.setup_archive()
+        self.setup_parsing()
         
         # Twilio configuration
         self.twilio_client = Client(
@@ -34,10 +77,19 @@ class SheinMonitor:
         )
         self.twilio_from = self.config['twilio_whatsapp_from']
         self.twilio_to = self.config['twilio_whatsapp_to']
+        self.alert_sender = AlertSender(self.twilio_client, self.twilio_from, self.config)
+        
+        # Persistent Chrome profile and disk cache, reused across restarts
+        self.chrome_profile = ChromeProfile(self.config)
         
-        # Initialize browser driver
-        self.driver = None
-        self.setup_driver()
+        # Initialize browser driver (recycled by the manager when it dies or grows too large)
+        self.driver_manager = DriverManager(self.setup_driver, self.config)
+        self.driver_manager.start()
+    
+    @property
+    def driver(self):
+        """Current Chrome driver owned by the driver manager"""
+        return self.driver_manager.driver
     
     def setup_driver(self):
         """Set up Chrome driver with options to avoid detection"""
@@ -49,11 +101,12 @@ class SheinMonitor:
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+        self.chrome_profile.apply(chrome_options)
         
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
+            driver = self.chrome_profile.launch(lambda: webdriver.Chrome(options=chrome_options))
             # Remove webdriver property
-            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
                 'source': '''
                     Object.defineProperty(navigator, 'webdriver', {
                         get: () => undefined
@@ -61,6 +114,7 @@ class SheinMonitor:
                 '''
             })
             print("✓ Chrome driver initialized")
+            return driver
         except Exception as e:
             print(f"✗ Failed to initialize Chrome driver: {e}")
             print("Please install ChromeDriver: brew install chromedriver")
@@ -71,6 +125,56 @@ class SheinMonitor:
         with open(config_path, 'r') as f:
             return json.load(f)
     
+    def setup_archive(self):
+        """Keep every fetched page for offline reparsing"""
+        self.archive = None
+        if self.config.get('archive_dir'):
+            self.archive = PageArchive(
+                self.config['archive_dir'],
+                self.config.get('archive_retention_days', 30),
+                self.config.get('archive_max_bytes')
+            )
+    
+    def setup_parsing(self):
+        """Choose the extractor for parse_mode, extract_in_browser and facet_rules"""
+        # Facet rules are compiled first, so an invalid rule leaves the current extractor in place
+        facet_rules = self.config.get('facet_rules')
+        text_counts = compile_facet_rules(facet_rules) if facet_rules else TEXT_COUNTS
+        browser_facets = compile_facet_rules(facet_rules, builtin=False) if facet_rules else None
+        
+        # Parsing mode: 'full' builds the whole soup, 'targeted' streams only the filter subtrees
+        if self.config.get('parse_mode', 'full') == 'targeted':
+            extractor = self.extract_counts_targeted
+            self.extractor_name = 'monitor.extract_counts_targeted'
+        else:
+            extractor = self.extract_counts
+            self.extractor_name = 'monitor.extract_counts'
+        
+        # Facet counts declared in config.json are found in the same text scan as the totals
+        self.extractor = partial(extractor, text_counts=text_counts)
+        
+        # Run the extractor inside the page instead of transferring page_source; facet
+        # rules are then matched against the count-bearing lines the page sends back
+        self.extract_in_browser = self.config.get('extract_in_browser', False)
+        self.browser_facets = browser_facets
+        if self.extract_in_browser:
+            self.extractor_name = 'browser_extract.extract_counts_in_browser'
+        # Identifies this extractor and its facet rules when parse results are shared
+        self.parse_key = f"{self.extractor_name}:{json.dumps(facet_rules, sort_keys=True)}"
+    
+    def apply_config(self, config):
+        """Apply an edited config.json; the warm browser is kept as is"""
+        warn_restart_keys(self.config, config)
+        self.config = config
+        self.storage_path = config.get('storage_path', 'product_counts.json')
+        self.url = config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')
+        self.check_interval = config.get('check_interval_seconds', 300)
+        self.twilio_to = config['twilio_whatsapp_to']
+        self.alert_sender.configure(config)
+        self.setup_archive()
+        self.setup_parsing()
+        self.events = get_event_bus(config)
+    
     def load_stored_counts(self):
         """Load previously stored counts from JSON file"""
         if os.path.exists(self.storage_path):
@@ -87,8 +191,8 @@ class SheinMonitor:
         with open(self.storage_path, 'w') as f:
             json.dump(data, f, indent=2)
     
-    def fetch_page(self):
-        """Fetch the Shein category page using Selenium"""
+    def load_page(self):
+        """Load the Shein category page in the browser"""
         try:
             self.driver.get(self.url)
             # Wait for page to load
@@ -101,32 +205,32 @@ class SheinMonitor:
                 )
             except:
                 pass
-            
-            return self.driver.page_source
         except Exception as e:
             print(f"✗ Error fetching page: {e}")
             raise
     
-    def extract_counts(self, html):
-        """Extract product counts from HTML"""
+    def fetch_page(self):
+        """Fetch the Shein category page using Selenium"""
+        self.load_page()
+        html = self.driver.page_source
+        check_html(html)
+        return html
+    
+    def fetch_counts_in_browser(self):
+        """Load the page and extract counts inside the browser"""
+        self.load_page()
+        check_driver(self.driver)
+        return extract_counts_in_browser(self.driver, self.browser_facets)
+    
+    @staticmethod
+    def extract_counts(html, text_counts=TEXT_COUNTS):
+        """Extract product counts from HTML; text_counts also carries any compiled facet rules"""
         soup = BeautifulSoup(html, 'html.parser')
-        counts = {}
         
         # Try multiple strategies to extract counts
-        # Strategy 1: Look for total products count
-        total_match = re.search(r'(\d{1,3}(?:,\d{3})*)\s*(?:products|items)', html, re.IGNORECASE)
-        if total_match:
-            counts['total'] = int(total_match.group(1).replace(',', ''))
-        
-        # Strategy 2: Look for gender filters with counts
-        # Search for patterns like "Women (2,914)" or "Men (7)"
-        women_match = re.search(r'Women[^\d]*\((\d{1,3}(?:,\d{3})*)\)', html, re.IGNORECASE)
-        men_match = re.search(r'Men[^\d]*\((\d{1,3}(?:,\d{3})*)\)', html, re.IGNORECASE)
-        
-        if women_match:
-            counts['women'] = int(women_match.group(1).replace(',', ''))
-        if men_match:
-            counts['men'] = int(men_match.group(1).replace(',', ''))
+        # Strategies 1 and 2: the total ("1,234 products"), gender filters such as
+        # "Women (2,914)" or "Men (7)" and every facet rule, in one scan of the text
+        counts = text_counts.scan(html)
         
         # Strategy 3: Parse structured data or JSON-LD
         json_ld_scripts = soup.find_all('script', type='application/ld+json')
@@ -154,6 +258,17 @@ class SheinMonitor:
         
         return counts if counts else None
     
+    @staticmethod
+    def extract_counts_targeted(html, text_counts=TEXT_COUNTS):
+        """Extract product counts, streaming only the JSON-LD and filter subtrees"""
+        # Strategies 1 and 2, with any facet rules, run in one scan of the raw text and need no tree
+        counts = text_counts.scan(html)
+        
+        # Strategies 3 and 4 in a single streaming pass
+        filter_counts, _ = extract_filter_counts(html)
+        counts.update(filter_counts)
+        return counts if counts else None
+    
     def compare_counts(self, old_counts, new_counts):
         """Compare old and new counts, return changes"""
         changes = {}
@@ -196,33 +311,40 @@ class SheinMonitor:
                 else:
                     message += f"{label}: {value:,}\n"
         
+        message += format_facet_changes(counts, changes)
+        
         message += f"\n🕐 Timestamp: {timestamp}\n"
         message += f"🔗 Source: {self.url}"
         
         return message
     
-    def send_whatsapp_alert(self, message):
-        """Send WhatsApp message via Twilio"""
-        try:
-            msg = self.twilio_client.messages.create(
-                body=message,
-                from_=self.twilio_from,
-                to=self.twilio_to
-            )
-            print(f"✓ WhatsApp alert sent successfully (SID: {msg.sid})")
-            return True
-        except Exception as e:
-            print(f"✗ Failed to send WhatsApp alert: {e}")
-            return False
+    def send_whatsapp_alert(self, message, to=None):
+        """Send WhatsApp message via Twilio to one or more recipients or groups"""
+        return self.alert_sender.send(message, to or self.twilio_to)
     
     def run_once(self):
         """Run a single monitoring check"""
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Checking Shein product counts...")
         
+        self.profiler.begin(self.url)
+        self.latency.begin()
         try:
             # Fetch and parse page
-            html = self.fetch_page()
-            new_counts = self.extract_counts(html)
+            if self.extract_in_browser:
+                new_counts = self.shared_fetch.fetch(f'browser-counts:{self.parse_key}', self.url, lambda: self.driver_manager.run(self.fetch_counts_in_browser))
+                self.block_stats.record(None)
+                self.latency.mark('fetched')
+                self.profiler.annotate(page_bytes=0, extractor=self.extractor_name)
+            else:
+                html = self.shared_fetch.fetch('browser', self.url, lambda: self.driver_manager.run(self.fetch_page), reuse=('browser-scrolled',))
+                self.block_stats.record(None)
+                self.latency.mark('fetched')
+                # The page is archived while the parse pool works on it
+                parsed = self.shared_fetch.parse_async(self.parse_pool, self.extractor, self.parse_key, html)
+                if self.archive and html:
+                    self.archive.store(self.url, html)
+                self.profiler.annotate(page_bytes=len(html) if html else 0, extractor=self.extractor_name)
+                new_counts = parsed.result()
             
             if not new_counts:
                 print("✗ Failed to extract product counts from page")
@@ -236,13 +358,18 @@ class SheinMonitor:
             
             # Compare counts
             changes = self.compare_counts(old_counts, new_counts)
+            self.latency.mark('diffed')
             
             if changes:
                 print(f"⚠ Changes detected: {changes}")
+                self.events.publish('counts_changed', {'url': self.url, 'counts': new_counts, 'changes': changes})
                 timestamp = datetime.utcnow().isoformat() + 'Z'
                 message = self.format_whatsapp_message(new_counts, changes, timestamp)
                 print(f"\nWhatsApp message:\n{message}\n")
-                self.send_whatsapp_alert(message)
+                self.latency.mark('queued')
+                if self.send_whatsapp_alert(message):
+                    self.latency.mark('accepted')
+                    self.latency.record(self.url, f"{self.extractor_name} every {self.check_interval}s")
             else:
                 if old_counts:
                     print("✓ No changes detected")
@@ -251,11 +378,23 @@ class SheinMonitor:
             
             # Save new counts
             self.save_counts(new_counts)
+            if self.read_api:
+                self.read_api.update_counts(self.url, new_counts)
+                self.read_api.update_status(self.url, last_check=datetime.utcnow().isoformat() + 'Z', block_rate=self.block_stats.rate())
             return True
             
+        except PageBlocked as e:
+            self.block_stats.record(e.kind)
+            if self.read_api:
+                self.read_api.update_status(self.url, last_blocked=e.kind, block_rate=self.block_stats.rate())
+            print(f"🛡 Got a {e} instead of the category page, skipping parse and keeping last good state")
+            print(f"🛡 Block rate: {self.block_stats.summary()}")
+            return False
         except Exception as e:
             print(f"✗ Error during monitoring: {e}")
             return False
+        finally:
+            self.profiler.finish()
     
     def run_continuous(self):
         """Run continuous monitoring loop"""
@@ -268,12 +407,12 @@ class SheinMonitor:
         try:
             while True:
                 self.run_once()
-                time.sleep(self.check_interval)
+                self.config_watcher.wait(lambda: self.check_interval, self.apply_config)
         except KeyboardInterrupt:
             print("\n\n👋 Monitoring stopped by user")
         finally:
             if self.driver:
-                self.driver.quit()
+                self.driver_manager.quit()
                 print("✓ Browser closed")
 
 
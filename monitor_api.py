@@ -8,10 +8,25 @@ import cloudscraper
 import json
 import time
 from datetime import datetime
+from functools import partial
 from twilio.rest import Client
 import os
 import re
 
+from parse_pool import get_parse_pool
+from facets import TEXT_COUNTS, compile_facet_rules, format_facet_changes
+from alerts import AlertSender
+from archive import PageArchive
+from block_detect import BlockStats, PageBlocked, check_response
+from proxy_pool import ProxyPool
+from profiler import CheckProfiler
+from read_api import start_read_api
+from events import get_event_bus
+from config_watch import ConfigWatcher, warn_restart_keys
+from latency import LatencyTracker
+from shared_fetch import get_shared_fetch
+from initial_state import extract_state_counts
+
 
 class SheinMonitor:
     def __init__(self, config_path='config.json'):
@@ -20,6 +35,32 @@ class SheinMonitor:
         self.storage_path = self.config.get('storage_path', 'product_counts.json')
         self.url = self.config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')
         self.check_interval = self.config.get('check_interval_seconds', 300)
+        self.config_watcher = ConfigWatcher(config_path, self.load_config, self.config.get('config_poll_seconds', 5))
+        self.profiler = CheckProfiler(self.config)
+        self.block_stats = BlockStats()
+        self.latency = LatencyTracker(self.config)
+        
+        # Change events for SSE clients and webhooks
+        self.events = get_event_bus(self.config)
+        
+        # Optional local read API serving the latest state from memory
+        self.read_api = None
+        if self.config.get('read_api_port'):
+            self.read_api = start_read_api(
+                self.config['read_api_port'],
+                self.config.get('read_api_host', '127.0.0.1'),
+                self.config.get('read_api_history_size', 500),
+                self.events
+            )
+            stored_data = self.load_stored_counts()
+            if stored_data:
+                self.read_api.update_counts(self.url, stored_data['counts'], stored_data['timestamp'])
+        self.parse_pool = get_parse_pool(self.config.get('parse_pool_workers', 0))
+        self.shared_fetch = get_shared_fetch(self.config)
+        
+        # Page archive and extractor are re-applied when config.json changes
+        self.setup_archive()
+        self.setup_parsing()
         
         # Extract category ID from URL
         self.category_id = self.extract_category_id(self.url)
@@ -31,9 +72,18 @@ class SheinMonitor:
         )
         self.twilio_from = self.config['twilio_whatsapp_from']
         self.twilio_to = self.config['twilio_whatsapp_to']
+        self.alert_sender = AlertSender(self.twilio_client, self.twilio_from, self.config)
         
         # Initialize cloudscraper
-        self.scraper = cloudscraper.create_scraper(
+        self.scraper = self.create_scraper()
+        
+        # Optional egress proxy pool; each proxy keeps its own sticky session
+        self.proxy_pool = None
+        self.setup_proxies()
+    
+    def create_scraper(self):
+        """Create a cloudscraper session with a desktop Chrome fingerprint"""
+        return cloudscraper.create_scraper(
             browser={
                 'browser': 'chrome',
                 'platform': 'windows',
@@ -65,6 +115,58 @@ class SheinMonitor:
         
         return config
     
+    def setup_archive(self):
+        """Keep every fetched page for offline reparsing"""
+        self.archive = None
+        if self.config.get('archive_dir'):
+            self.archive = PageArchive(
+                self.config['archive_dir'],
+                self.config.get('archive_retention_days', 30),
+                self.config.get('archive_max_bytes')
+            )
+    
+    def setup_parsing(self):
+        """Choose the extractor and compile facet_rules into it"""
+        # Facet rules are compiled first, so an invalid rule leaves the current extractor in place
+        facet_rules = self.config.get('facet_rules')
+        text_counts = compile_facet_rules(facet_rules) if facet_rules else TEXT_COUNTS
+        
+        # Facet counts declared in config.json are found in the same text scan as the totals
+        self.extractor = partial(self.extract_counts, text_counts=text_counts)
+        self.extractor_name = 'monitor_api.extract_counts'
+        # Identifies this extractor and its facet rules when parse results are shared
+        self.parse_key = f"{self.extractor_name}:{json.dumps(facet_rules, sort_keys=True)}"
+    
+    def setup_proxies(self):
+        """Create or update the proxy pool; proxies kept across a reload keep their health and session"""
+        if not self.config.get('proxies'):
+            self.proxy_pool = None
+        elif self.proxy_pool:
+            self.proxy_pool.configure(self.config['proxies'], self.config)
+        else:
+            self.proxy_pool = ProxyPool(self.config['proxies'], self.create_scraper, self.config)
+    
+    def publish_status(self, **status):
+        """Record check health in the read API, with per-proxy health when a pool is in use"""
+        if self.proxy_pool:
+            status['proxies'] = self.proxy_pool.snapshot()
+        self.read_api.update_status(self.url, **status)
+    
+    def apply_config(self, config):
+        """Apply an edited config.json; the warm scraper session is kept as is"""
+        warn_restart_keys(self.config, config)
+        self.config = config
+        self.storage_path = config.get('storage_path', 'product_counts.json')
+        self.url = config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')
+        self.check_interval = config.get('check_interval_seconds', 300)
+        self.twilio_to = config['twilio_whatsapp_to']
+        self.alert_sender.configure(config)
+        self.category_id = self.extract_category_id(self.url)
+        self.setup_archive()
+        self.setup_parsing()
+        self.events = get_event_bus(config)
+        self.setup_proxies()
+    
     def load_stored_counts(self):
         """Load previously stored counts from JSON file"""
         if os.path.exists(self.storage_path):
@@ -81,66 +183,62 @@ class SheinMonitor:
         with open(self.storage_path, 'w') as f:
             json.dump(data, f, indent=2)
     
+    def get_page(self, scraper):
+        """Request the category page with a scraper session, warming up the session on a 403"""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Referer': 'https://www.sheinindia.in/',
+        }
+        response = scraper.get(self.url, headers=headers, timeout=30, allow_redirects=True)
+        
+        # Try without raising for status first to see what we get
+        if response.status_code == 403:
+            print(f"✗ Still getting 403. Response headers: {dict(response.headers)}")
+            # Try a more stealthy approach - just fetch homepage first
+            print("Trying to establish session by visiting homepage first...")
+            scraper.get('https://www.sheinindia.in/', headers=headers, timeout=30)
+            time.sleep(2)
+            response = scraper.get(self.url, headers=headers, timeout=30)
+        return response
+    
     def fetch_page(self):
         """Fetch the Shein page and try to extract data from JavaScript"""
         try:
             # Try to get the HTML page first
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Referer': 'https://www.sheinindia.in/',
-            }
-            response = self.scraper.get(self.url, headers=headers, timeout=30, allow_redirects=True)
-            
-            # Try without raising for status first to see what we get
-            if response.status_code == 403:
-                print(f"✗ Still getting 403. Response headers: {dict(response.headers)}")
-                # Try a more stealthy approach - just fetch homepage first
-                print("Trying to establish session by visiting homepage first...")
-                self.scraper.get('https://www.sheinindia.in/', headers=headers, timeout=30)
-                time.sleep(2)
-                response = self.scraper.get(self.url, headers=headers, timeout=30)
+            if self.proxy_pool:
+                response = self.proxy_pool.request(self.get_page)
+            else:
+                response = self.get_page(self.scraper)
             
+            check_response(response)
             response.raise_for_status()
             return response.text
+        except PageBlocked:
+            raise
         except Exception as e:
             print(f"✗ Error fetching page: {e}")
             # Return None instead of raising to allow graceful handling
             return None
     
-    def extract_counts(self, html):
-        """Extract product counts from HTML or return dummy data"""
+    @staticmethod
+    def extract_counts(html, text_counts=TEXT_COUNTS):
+        """Extract product counts from HTML or return dummy data; text_counts also carries any facet rules"""
         if not html:
             print("⚠ No HTML content, using fallback method...")
             # Return a basic count to test the notification system
             return {'status': 'unavailable', 'note': 'Could not fetch data due to bot protection'}
         
-        counts = {}
-        
-        # Try to find JSON data in script tags
-        json_match = re.search(r'window\.__INITIAL_STATE__\s*=\s*({.+?});', html, re.DOTALL)
-        if json_match:
-            try:
-                data = json.loads(json_match.group(1))
-                # Try to extract product count from the data
-                if 'products' in data:
-                    counts['total'] = len(data['products'])
-            except:
-                pass
-        
-        # Try regex patterns
-        total_match = re.search(r'(\d{1,3}(?:,\d{3})*)\s*(?:products|items)', html, re.IGNORECASE)
-        if total_match:
-            counts['total'] = int(total_match.group(1).replace(',', ''))
+        # Total, gender and facet-rule counts from one scan of the page text
+        scanned = text_counts.scan(html)
         
-        women_match = re.search(r'Women[^\d]*\((\d{1,3}(?:,\d{3})*)\)', html, re.IGNORECASE)
-        men_match = re.search(r'Men[^\d]*\((\d{1,3}(?:,\d{3})*)\)', html, re.IGNORECASE)
+        # Primary source: totals and gender facet counts from the embedded page state
+        counts = extract_state_counts(html, scanned.get('total'))
         
-        if women_match:
-            counts['women'] = int(women_match.group(1).replace(',', ''))
-        if men_match:
-            counts['men'] = int(men_match.group(1).replace(',', ''))
+        # Fall back to text patterns for anything the state did not provide
+        for key, value in scanned.items():
+            counts.setdefault(key, value)
         
         return counts if counts else None
     
@@ -188,34 +286,36 @@ class SheinMonitor:
                         message += f"{label}: {value:,} ({sign}{diff:,})\n"
                     else:
                         message += f"{label}: {value:,}\n"
+            
+            message += format_facet_changes(counts, changes)
         
         message += f"\n🕐 Timestamp: {timestamp}\n"
         message += f"🔗 Source: {self.url}"
         
         return message
     
-    def send_whatsapp_alert(self, message):
-        """Send WhatsApp message via Twilio"""
-        try:
-            msg = self.twilio_client.messages.create(
-                body=message,
-                from_=self.twilio_from,
-                to=self.twilio_to
-            )
-            print(f"✓ WhatsApp alert sent successfully (SID: {msg.sid})")
-            return True
-        except Exception as e:
-            print(f"✗ Failed to send WhatsApp alert: {e}")
-            return False
+    def send_whatsapp_alert(self, message, to=None):
+        """Send WhatsApp message via Twilio to one or more recipients or groups"""
+        return self.alert_sender.send(message, to or self.twilio_to)
     
     def run_once(self):
         """Run a single monitoring check"""
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Checking Shein product counts...")
         
+        self.profiler.begin(self.url)
+        self.latency.begin()
         try:
             # Fetch and parse page
-            html = self.fetch_page()
-            new_counts = self.extract_counts(html)
+            html = self.shared_fetch.fetch('http', self.url, self.fetch_page)
+            if html:
+                self.block_stats.record(None)
+                self.latency.mark('fetched')
+            # The page is archived while the parse pool works on it
+            parsed = self.shared_fetch.parse_async(self.parse_pool, self.extractor, self.parse_key, html)
+            if self.archive and html:
+                self.archive.store(self.url, html)
+            self.profiler.annotate(page_bytes=len(html) if html else 0, extractor=self.extractor_name)
+            new_counts = parsed.result()
             
             if not new_counts:
                 print("✗ Failed to extract product counts from page")
@@ -231,28 +331,50 @@ class SheinMonitor:
             # Compare counts (skip comparison if status check)
             if 'status' not in new_counts:
                 changes = self.compare_counts(old_counts, new_counts)
+                self.latency.mark('diffed')
                 
                 if changes:
                     print(f"⚠ Changes detected: {changes}")
+                    self.events.publish('counts_changed', {'url': self.url, 'counts': new_counts, 'changes': changes})
                     timestamp = datetime.utcnow().isoformat() + 'Z'
                     message = self.format_whatsapp_message(new_counts, changes, timestamp)
                     print(f"\nWhatsApp message:\n{message}\n")
-                    self.send_whatsapp_alert(message)
+                    self.latency.mark('queued')
+                    if self.send_whatsapp_alert(message):
+                        self.latency.mark('accepted')
+                        self.latency.record(self.url, f"{self.extractor_name} every {self.check_interval}s")
                 else:
                     if old_counts:
                         print("✓ No changes detected")
                     else:
                         print("✓ Initial counts stored")
             
+            # Never replace real counts with a failure placeholder
+            if 'status' in new_counts and old_counts and 'status' not in old_counts:
+                print("⚠ Keeping last good counts")
+                return False
+            
             # Save new counts
             self.save_counts(new_counts)
+            if self.read_api:
+                self.read_api.update_counts(self.url, new_counts)
+                self.publish_status(last_check=datetime.utcnow().isoformat() + 'Z', block_rate=self.block_stats.rate())
             return True
             
+        except PageBlocked as e:
+            self.block_stats.record(e.kind)
+            if self.read_api:
+                self.publish_status(last_blocked=e.kind, block_rate=self.block_stats.rate())
+            print(f"🛡 Got a {e} instead of the category page, skipping parse and keeping last good state")
+            print(f"🛡 Block rate: {self.block_stats.summary()}")
+            return False
         except Exception as e:
             print(f"✗ Error during monitoring: {e}")
             import traceback
             traceback.print_exc()
             return False
+        finally:
+            self.profiler.finish()
     
     def run_continuous(self):
         """Run continuous monitoring loop"""
@@ -265,7 +387,7 @@ class SheinMonitor:
         try:
             while True:
                 self.run_once()
-                time.sleep(self.check_interval)
+                self.config_watcher.wait(lambda: self.check_interval, self.apply_config)
         except KeyboardInterrupt:
             print("\n\n👋 Monitoring stopped by user")
 
@@ -17,6 +17,26 @@ from datetime import datetime
 from twilio.rest import Client
 import os
 import re
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from parse_pool import get_parse_pool
+from driver_manager import DriverManager
+from chrome_profile import ChromeProfile
+from alerts import AlertSender
+from archive import PageArchive
+from block_detect import BlockStats, PageBlocked, check_driver, check_html
+from profiler import CheckProfiler
+from read_api import start_read_api
+from events import get_event_bus
+from config_watch import ConfigWatcher, warn_restart_keys
+from latency import LatencyTracker
+from shared_fetch import get_shared_fetch
+import targeted_parse
+from browser_extract import extract_products_in_browser
+from watch_rules import WatchRuleEngine, is_mens_text
+from enrichment import ProductEnricher, StockWatch
+from sitemap import SitemapScanner
+from product_record import Product, compact_products, json_default
 
 
 class SheinProductMonitor:
@@ -26,6 +46,32 @@ class SheinProductMonitor:
         self.storage_path = 'tracked_products.json'
         self.url = self.config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')
         self.check_interval = self.config.get('check_interval_seconds', 300)
+        self.config_watcher = ConfigWatcher(config_path, self.load_config, self.config.get('config_poll_seconds', 5))
+        self.profiler = CheckProfiler(self.config)
+        self.block_stats = BlockStats()
+        self.latency = LatencyTracker(self.config)
+        
+        # Change events for SSE clients and webhooks
+        self.events = get_event_bus(self.config)
+        
+        # Optional local read API serving the latest state from memory
+        self.read_api = None
+        if self.config.get('read_api_port'):
+            self.read_api = start_read_api(
+                self.config['read_api_port'],
+                self.config.get('read_api_host', '127.0.0.1'),
+                self.config.get('read_api_history_size', 500),
+                self.events
+            )
+            tracked = self.load_tracked_products()
+            if tracked['timestamp']:
+                self.read_api.update_products(self.url, tracked, tracked['timestamp'])
+        self.parse_pool = get_parse_pool(self.config.get('parse_pool_workers', 0))
+        self.shared_fetch = get_shared_fetch(self.config)
+        
+        # Page archive and extractor are re-applied when config.json changes
+        self.setup_archive()
+        self.setup_parsing()
         
         # Twilio configuration
         self.twilio_client = Client(
@@ -34,10 +80,22 @@ class SheinProductMonitor:
         )
         self.twilio_from = self.config['twilio_whatsapp_from']
         self.twilio_to = self.config['twilio_whatsapp_to']
+        self.alert_sender = AlertSender(self.twilio_client, self.twilio_from, self.config)
         
-        # Initialize browser driver
-        self.driver = None
-        self.setup_driver()
+        # Subscriber watch rules, enrichment and crawl settings (re-applied on config reload)
+        self.apply_watch_config()
+        
+        # Persistent Chrome profile and disk cache, reused across restarts
+        self.chrome_profile = ChromeProfile(self.config)
+        
+        # Initialize browser driver (recycled by the manager when it dies or grows too large)
+        self.driver_manager = DriverManager(self.setup_driver, self.config)
+        self.driver_manager.start()
+    
+    @property
+    def driver(self):
+        """Current Chrome driver owned by the driver manager"""
+        return self.driver_manager.driver
     
     def setup_driver(self):
         """Set up Chrome driver with options"""
@@ -49,10 +107,11 @@ class SheinProductMonitor:
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+        self.chrome_profile.apply(chrome_options)
         
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            driver = self.chrome_profile.launch(lambda: webdriver.Chrome(options=chrome_options))
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
                 'source': '''
                     Object.defineProperty(navigator, 'webdriver', {
                         get: () => undefined
@@ -60,6 +119,7 @@ class SheinProductMonitor:
                 '''
             })
             print("✓ Chrome driver initialized")
+            return driver
         except Exception as e:
             print(f"✗ Failed to initialize Chrome driver: {e}")
             raise
@@ -79,6 +139,79 @@ class SheinProductMonitor:
         
         return config
     
+    def apply_watch_config(self):
+        """Set up subscribers, enrichment and crawl settings from self.config"""
+        # Subscriber watch rules; by default new men's products go to twilio_whatsapp_to
+        self.subscribers = self.config.get('subscribers') or [{
+            'to': self.twilio_to,
+            'title': "New Men's Products on Shein!",
+            'rules': [{'category': 'men'}]
+        }]
+        self.watch_rules = WatchRuleEngine(self.subscribers)
+        
+        # Optional detail-page enrichment with size-level stock for new and watched products
+        self.watch_ids = {int(product_id) for product_id in self.config.get('watch_product_ids', [])}
+        self.enricher = None
+        if self.config.get('enrich_products') or self.watch_ids:
+            self.enricher = getattr(self, 'enricher', None) or ProductEnricher(self.config)
+        
+        # Watched products alert watch_alert_to (default twilio_whatsapp_to) when their sizes change
+        self.stock_watch = None
+        if self.watch_ids:
+            self.stock_watch = getattr(self, 'stock_watch', None) or StockWatch(self.config.get('watch_state_path', 'watched_products.json'))
+        
+        # Incremental mode walks the newest-first listing and stops at the first known product
+        self.incremental = self.config.get('incremental_crawl', False)
+        self.incremental_max_pages = self.config.get('incremental_max_pages', 10)
+        self.tracked_limit = self.config.get('tracked_products_limit', 5000)
+        
+        # Catalog-wide new products from the storefront sitemaps, scanned every sitemap_interval_seconds
+        self.sitemap = None
+        if self.config.get('sitemap_discovery'):
+            self.sitemap = getattr(self, 'sitemap', None) or SitemapScanner(self.config)
+        self.sitemap_interval = self.config.get('sitemap_interval_seconds', 3600)
+        self.sitemap_due = getattr(self, 'sitemap_due', 0)
+    
+    def setup_archive(self):
+        """Keep every fetched page for offline reparsing"""
+        self.archive = None
+        if self.config.get('archive_dir'):
+            self.archive = PageArchive(
+                self.config['archive_dir'],
+                self.config.get('archive_retention_days', 30),
+                self.config.get('archive_max_bytes')
+            )
+    
+    def setup_parsing(self):
+        """Choose the extractor for parse_mode and extract_in_browser"""
+        # Parsing mode: 'full' builds the whole soup, 'targeted' streams one product card at a time
+        if self.config.get('parse_mode', 'full') == 'targeted':
+            self.extractor = targeted_parse.extract_products
+            self.extractor_name = 'targeted_parse.extract_products'
+        else:
+            self.extractor = self.extract_products
+            self.extractor_name = 'monitor_products.extract_products'
+        
+        # Run the extractor inside the page instead of transferring page_source
+        self.extract_in_browser = self.config.get('extract_in_browser', False)
+        if self.extract_in_browser:
+            self.extractor_name = 'browser_extract.extract_products_in_browser'
+        # Identifies this extractor when parse results are shared
+        self.parse_key = self.extractor_name
+    
+    def apply_config(self, config):
+        """Apply an edited config.json; the warm browser is kept as is"""
+        warn_restart_keys(self.config, config)
+        self.config = config
+        self.url = config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')
+        self.check_interval = config.get('check_interval_seconds', 300)
+        self.twilio_to = config['twilio_whatsapp_to']
+        self.alert_sender.configure(config)
+        self.apply_watch_config()
+        self.setup_archive()
+        self.setup_parsing()
+        self.events = get_event_bus(config)
+    
     def load_tracked_products(self):
         """Load previously tracked products from JSON file"""
         if os.path.exists(self.storage_path):
@@ -91,28 +224,42 @@ class SheinProductMonitor:
         data = {
             'men': products.get('men', []),
             'women': products.get('women', []),
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            # Whether the list holds the newest-first listing the incremental crawl compares against
+            'newest_seeded': self.incremental
         }
         with open(self.storage_path, 'w') as f:
-            json.dump(data, f, indent=2)
+            json.dump(data, f, indent=2, default=json_default)
     
-    def fetch_page(self):
-        """Fetch the Shein category page using Selenium"""
+    def load_page(self, url=None):
+        """Load the Shein category page in the browser and scroll the grid"""
         try:
-            self.driver.get(self.url)
+            self.driver.get(url or self.url)
             time.sleep(5)
             
             # Scroll to load more products
             for _ in range(3):
                 self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
                 time.sleep(2)
-            
-            return self.driver.page_source
         except Exception as e:
             print(f"✗ Error fetching page: {e}")
             raise
     
-    def extract_products(self, html):
+    def fetch_page(self, url=None):
+        """Fetch the Shein category page using Selenium"""
+        self.load_page(url)
+        html = self.driver.page_source
+        check_html(html)
+        return html
+    
+    def fetch_products_in_browser(self, url=None):
+        """Load the page and extract products inside the browser"""
+        self.load_page(url)
+        check_driver(self.driver)
+        return compact_products(extract_products_in_browser(self.driver))
+    
+    @staticmethod
+    def extract_products(html):
         """Extract product details from HTML"""
         soup = BeautifulSoup(html, 'html.parser')
         products = {'men': [], 'women': []}
@@ -123,16 +270,25 @@ class SheinProductMonitor:
         
         print(f"Found {len(product_elements)} potential product elements")
         
+        # Containers such as `product-list` match the card classes too; only the innermost
+        # elements holding a product link are cards
+        product_link = re.compile(r'-p-\d+')
+        cards = [elem for elem in product_elements if elem.find('a', href=product_link)]
+        card_ids = {id(elem) for elem in cards}
+        containers = {id(parent) for elem in cards for parent in elem.parents if id(parent) in card_ids}
+        product_elements = [elem for elem in cards if id(elem) not in containers]
+        
+        # One shared timestamp for every product found in this page
+        detected = time.time()
+        
         for elem in product_elements:
             try:
                 # Extract product link
-                link_tag = elem.find('a', href=True)
+                link_tag = elem.find('a', href=product_link)
                 if not link_tag:
                     continue
                 
                 product_url = link_tag['href']
-                if not product_url.startswith('http'):
-                    product_url = 'https://www.sheinindia.in' + product_url
                 
                 # Extract product ID from URL
                 product_id_match = re.search(r'-p-(\d+)', product_url)
@@ -150,15 +306,9 @@ class SheinProductMonitor:
                 
                 # Try to determine gender from product name or attributes
                 product_text = elem.get_text().lower()
-                is_men = any(keyword in product_text for keyword in ['men', 'man', 'mens', "men's", 'male', 'boy'])
+                is_men = is_mens_text(product_text)
                 
-                product_info = {
-                    'id': product_id,
-                    'name': product_name[:100],  # Limit length
-                    'url': product_url,
-                    'price': price,
-                    'detected_at': datetime.utcnow().isoformat() + 'Z'
-                }
+                product_info = Product(product_id, product_name[:100], product_url, price, detected)
                 
                 if is_men:
                     products['men'].append(product_info)
@@ -172,99 +322,274 @@ class SheinProductMonitor:
         print(f"✓ Extracted {len(products['men'])} men's products, {len(products['women'])} women's products")
         return products
     
+    def newest_page_url(self, page):
+        """Category URL sorted by newest arrivals, for the given page number"""
+        parts = urlparse(self.url)
+        query = dict(parse_qsl(parts.query))
+        query.update(parse_qsl(self.config.get('newest_sort_query', 'sort=newn')))
+        query[self.config.get('page_param', 'page')] = str(page)
+        return urlunparse(parts._replace(query=urlencode(query)))
+    
+    def fetch_products(self, url=None):
+        """Fetch one listing page and extract its products"""
+        if self.extract_in_browser:
+            products = self.shared_fetch.fetch('browser-products', url or self.url, lambda: self.driver_manager.run(lambda: self.fetch_products_in_browser(url)))
+            self.block_stats.record(None)
+            self.profiler.annotate(page_bytes=0, extractor=self.extractor_name)
+            return products
+        
+        html = self.shared_fetch.fetch('browser-scrolled', url or self.url, lambda: self.driver_manager.run(lambda: self.fetch_page(url)))
+        self.block_stats.record(None)
+        # The page is archived while the parse pool works on it
+        parsed = self.shared_fetch.parse_async(self.parse_pool, self.extractor, self.parse_key, html)
+        if self.archive and html:
+            self.archive.store(url or self.url, html)
+        self.profiler.annotate(page_bytes=len(html) if html else 0, extractor=self.extractor_name)
+        return parsed.result()
+    
+    def crawl_newest(self, old_products, seed=False):
+        """Walk the newest-first listing until a page contains an already tracked product
+        
+        With seed, every page up to incremental_max_pages is read, to record the listing
+        before the first incremental check. Returns the unseen products merged in front
+        of the tracked ones, or None if the first page could not be parsed.
+        """
+        known_ids = {int(p['id']) for category in ('men', 'women') for p in old_products.get(category, [])}
+        fresh = {'men': [], 'women': []}
+        
+        for page in range(1, self.incremental_max_pages + 1):
+            products = self.fetch_products(self.newest_page_url(page))
+            page_items = products['men'] + products['women']
+            if not page_items:
+                if page == 1:
+                    return None
+                break
+            
+            # Categories are split per page, so stop after the page where a known product shows up
+            reached_known = any(p.id in known_ids for p in page_items)
+            for category in ('men', 'women'):
+                fresh[category].extend(p for p in products[category] if p.id not in known_ids)
+            if reached_known and not seed:
+                break
+            known_ids.update(p.id for p in page_items)
+        
+        old = compact_products({category: old_products.get(category, []) for category in ('men', 'women')})
+        return {
+            category: (fresh[category] + old[category])[:self.tracked_limit]
+            for category in ('men', 'women')
+        }
+    
     def find_new_products(self, old_products, new_products, category='men'):
         """Find new products in a category"""
-        old_ids = set(p['id'] for p in old_products.get(category, []))
+        old_ids = set(int(p['id']) for p in old_products.get(category, []))
         new_items = []
         
         for product in new_products.get(category, []):
-            if product['id'] not in old_ids:
+            if product.id not in old_ids:
                 new_items.append(product)
         
         return new_items
     
-    def format_whatsapp_message(self, new_products):
+    def format_whatsapp_message(self, new_products, title="New Men's Products on Shein!"):
         """Format the WhatsApp alert message for new products"""
-        message = "🆕 *New Men's Products on Shein!*\n\n"
+        message = f"🆕 *{title}*\n\n"
         
-        for i, product in enumerate(new_products[:5], 1):  # Limit to 5 products per message
+        # Every product is listed unless alert_max_products is set; long messages are sent in parts
+        limit = self.config.get('alert_max_products') or len(new_products)
+        for i, product in enumerate(new_products[:limit], 1):
             message += f"{i}. {product['name']}\n"
             message += f"   💰 {product['price']}\n"
             message += f"   🔗 {product['url']}\n\n"
         
-        if len(new_products) > 5:
-            message += f"... and {len(new_products) - 5} more new products!\n\n"
+        if len(new_products) > limit:
+            message += f"... and {len(new_products) - limit} more new products!\n\n"
         
         message += f"🕐 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         
         return message
     
-    def send_whatsapp_alert(self, message):
-        """Send WhatsApp message via Twilio"""
-        try:
-            # Split message if too long (WhatsApp limit ~1600 chars)
-            if len(message) > 1500:
-                # Send first part
-                msg1 = self.twilio_client.messages.create(
-                    body=message[:1500] + "...",
-                    from_=self.twilio_from,
-                    to=self.twilio_to
-                )
-                print(f"✓ WhatsApp alert (part 1) sent (SID: {msg1.sid})")
+    def watched_products(self, old_products, new_products):
+        """Watched products from the current page, else from the tracked list or their last known state"""
+        found = {}
+        for products in (new_products, compact_products({c: old_products.get(c, []) for c in ('men', 'women')})):
+            for category in ('men', 'women'):
+                for product in products[category]:
+                    if product.id in self.watch_ids:
+                        found.setdefault(product.id, product)
+        for product_id in self.watch_ids - set(found):
+            entry = self.stock_watch.get(product_id)
+            if entry:
+                found[product_id] = Product(product_id, entry['name'], entry['url'], 'N/A')
             else:
-                msg = self.twilio_client.messages.create(
-                    body=message,
-                    from_=self.twilio_from,
-                    to=self.twilio_to
-                )
-                print(f"✓ WhatsApp alert sent successfully (SID: {msg.sid})")
-            return True
-        except Exception as e:
-            print(f"✗ Failed to send WhatsApp alert: {e}")
-            return False
+                print(f"⚠ Watched product {product_id} has not been seen yet, no URL to check")
+        return list(found.values())
+    
+    def format_stock_message(self, changes):
+        """Format the WhatsApp alert for watched products whose sizes changed"""
+        message = "🔔 *Watched products changed on Shein!*\n\n"
+        for product, old_sizes, new_sizes in changes:
+            added = [size for size in new_sizes if size not in old_sizes]
+            removed = [size for size in old_sizes if size not in new_sizes]
+            status = 'Back in stock' if new_sizes and not old_sizes else 'Sold out' if not new_sizes else 'Sizes changed'
+            message += f"{status}: {product['name']}\n"
+            if added:
+                message += f"   ➕ {', '.join(added)}\n"
+            if removed:
+                message += f"   ➖ {', '.join(removed)}\n"
+            message += f"   🔗 {product['url']}\n\n"
+        message += f"🕐 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        return message
+    
+    def send_whatsapp_alert(self, message, to=None):
+        """Send WhatsApp message via Twilio to one or more recipients or groups"""
+        return self.alert_sender.send(message, to or self.twilio_to)
+    
+    def send_whatsapp_alerts(self, alerts):
+        """Send [(message, to), ...] at once through the alert pool; returns whether each was sent"""
+        futures = [self.alert_sender.submit(message, to or self.twilio_to) for message, to in alerts]
+        return [self.alert_sender.wait(sends) for sends in futures]
     
     def run_once(self):
         """Run a single monitoring check"""
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Checking for new products...")
         
+        self.profiler.begin(self.url)
+        self.latency.begin()
         try:
-            # Fetch and parse page
-            html = self.fetch_page()
-            new_products = self.extract_products(html)
+            # Load previous products
+            old_products = self.load_tracked_products()
+            
+            # Fetch and parse the newest pages, or the whole grid without incremental_crawl.
+            # The first incremental check, or the first after it was switched on, records the
+            # newest-first listing so later checks compare against the same listing
+            seeding = self.incremental and not old_products.get('newest_seeded')
+            if self.incremental:
+                new_products = self.crawl_newest(old_products, seed=seeding)
+            else:
+                new_products = self.fetch_products()
+            self.latency.mark('fetched')
             
-            if not new_products['men'] and not new_products['women']:
+            if not new_products or (not new_products['men'] and not new_products['women']):
                 print("✗ Failed to extract products from page")
                 return False
             
-            # Load previous products
-            old_products = self.load_tracked_products()
+            # Find new products and match them against every subscriber's rules
+            new_items = {
+                category: self.find_new_products(old_products, new_products, category)
+                for category in ('men', 'women')
+            }
+            if seeding:
+                # Products the tracked grid did not show are not new arrivals
+                print("✓ Recording the newest-first listing, no alerts this check")
+                new_items = {'men': [], 'women': []}
+            
+            # Add catalog-wide arrivals from the sitemaps that the grid has not shown, and
+            # track them so the grid does not report them again once they show up there
+            if self.sitemap:
+                listed = {p.id for category in ('men', 'women') for p in new_products[category]}
+                if not self.incremental:
+                    # A full fetch only holds the grid page; carry earlier sitemap arrivals along
+                    old = compact_products({category: old_products.get(category, []) for category in ('men', 'women')})
+                    for category in ('men', 'women'):
+                        carried = [p for p in old[category] if p.get('source') == 'sitemap' and p.id not in listed]
+                        new_products[category] = (new_products[category] + carried)[:self.tracked_limit]
+                        listed.update(p.id for p in carried)
+                if time.time() >= self.sitemap_due:
+                    self.sitemap_due = time.time() + self.sitemap_interval
+                    try:
+                        arrivals = self.sitemap.scan(listed)
+                    except Exception as e:
+                        # The grid results still count; the sitemaps are retried sooner than usual
+                        print(f"✗ Sitemap scan failed, continuing with the grid: {e}")
+                        arrivals = {}
+                        self.sitemap_due = time.time() + self.config.get('sitemap_retry_seconds', 600)
+                    for category, products in arrivals.items():
+                        products = [p for p in products if p.id not in listed]
+                        for product in products:
+                            product['source'] = 'sitemap'
+                        new_items[category].extend(products)
+                        new_products[category] = products + new_products[category]
+            self.latency.mark('diffed')
             
-            # Find new men's products
-            new_mens_products = self.find_new_products(old_products, new_products, 'men')
+            watched = self.watched_products(old_products, new_products) if self.stock_watch else []
+            if self.enricher:
+                to_enrich = {p.id: p for products in new_items.values() for p in products}
+                if self.config.get('enrich_products'):
+                    to_enrich.update((p.id, p) for p in watched)
+                else:
+                    to_enrich = {p.id: p for p in watched}
+                self.enricher.enrich(list(to_enrich.values()))
+                self.latency.mark('enriched')
+            stock_changes = self.stock_watch.update(watched) if self.stock_watch else []
+            
+            matches = self.watch_rules.match(new_items)
+            if any(new_items.values()):
+                self.events.publish('new_products', {'url': self.url, 'products': new_items})
             
-            if new_mens_products:
-                print(f"🎉 Found {len(new_mens_products)} new men's products!")
-                for product in new_mens_products:
-                    print(f"  - {product['name']} ({product['price']})")
+            alerts = []
+            if stock_changes:
+                message = self.format_stock_message(stock_changes)
+                print(f"🔔 {len(stock_changes)} watched products changed\n\nWhatsApp message:\n{message}\n")
+                alerts.append((message, self.config.get('watch_alert_to')))
+            
+            if matches:
+                for subscriber, products in matches:
+                    print(f"🎉 Found {len(products)} new products for {subscriber['to']}!")
+                    for product in products:
+                        print(f"  - {product['name']} ({product['price']})")
+                    
+                    message = self.format_whatsapp_message(products, subscriber.get('title', 'New Products on Shein!'))
+                    print(f"\nWhatsApp message:\n{message}\n")
+                    alerts.append((message, subscriber['to']))
                 
-                message = self.format_whatsapp_message(new_mens_products)
-                print(f"\nWhatsApp message:\n{message}\n")
-                self.send_whatsapp_alert(message)
+                # Every subscriber's alert (and the stock alert) goes out through the pool at once
+                self.latency.mark('queued')
+                sent = self.send_whatsapp_alerts(alerts)
+                
+                # One latency sample per alerted product, however many subscribers it went to.
+                # Grid products carry no listing time; the previous check, which did not show
+                # them yet, bounds it
+                alerted = {}
+                for (subscriber, products), ok in zip(matches, sent[len(alerts) - len(matches):]):
+                    if ok:
+                        alerted.update((product.id, product) for product in products)
+                if alerted:
+                    self.latency.mark('accepted')
+                    self.latency.record(
+                        self.url,
+                        f"{self.extractor_name} every {self.check_interval}s",
+                        seen_at=[product.detected for product in alerted.values()],
+                        listed_at=[product.get('listed_at') or old_products['timestamp'] for product in alerted.values()]
+                    )
             else:
+                if alerts:
+                    self.send_whatsapp_alerts(alerts)
                 if old_products['timestamp']:
-                    print("✓ No new men's products detected")
+                    print("✓ No new matching products detected")
                 else:
                     print("✓ Initial product list stored")
             
             # Save current products
             self.save_tracked_products(new_products)
+            if self.read_api:
+                self.read_api.update_products(self.url, new_products)
+                self.read_api.update_status(self.url, last_check=datetime.utcnow().isoformat() + 'Z', block_rate=self.block_stats.rate())
             return True
             
+        except PageBlocked as e:
+            self.block_stats.record(e.kind)
+            if self.read_api:
+                self.read_api.update_status(self.url, last_blocked=e.kind, block_rate=self.block_stats.rate())
+            print(f"🛡 Got a {e} instead of the category page, skipping parse and keeping last good state")
+            print(f"🛡 Block rate: {self.block_stats.summary()}")
+            return False
         except Exception as e:
             print(f"✗ Error during monitoring: {e}")
             import traceback
             traceback.print_exc()
             return False
+        finally:
+            self.profiler.finish()
     
     def run_continuous(self):
         """Run continuous monitoring loop"""
@@ -272,19 +597,19 @@ class SheinProductMonitor:
         print(f"📍 Monitoring: {self.url}")
         print(f"⏱ Check interval: {self.check_interval} seconds")
         print(f"📱 WhatsApp alerts to: {self.twilio_to}")
-        print("🎯 Tracking: New men's products only")
+        print(f"🎯 Tracking: {len(self.subscribers)} subscriber(s)")
         print("\nPress Ctrl+C to stop\n")
         
         try:
             while True:
                 self.run_once()
                 print(f"\nNext check in {self.check_interval} seconds...")
-                time.sleep(self.check_interval)
+                self.config_watcher.wait(lambda: self.check_interval, self.apply_config)
         except KeyboardInterrupt:
             print("\n\n👋 Monitoring stopped by user")
         finally:
             if self.driver:
-                self.driver.quit()
+                self.driver_manager.quit()
                 print("✓ Browser closed")
 
 
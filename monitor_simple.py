@@ -7,12 +7,26 @@ Monitors product counts on Shein category page and sends alerts via Twilio Whats
 import cloudscraper
 from bs4 import BeautifulSoup
 import json
-import time
 from datetime import datetime
+from functools import partial
 from twilio.rest import Client
 import os
 import re
 
+from parse_pool import get_parse_pool
+from facets import TEXT_COUNTS, compile_facet_rules, format_facet_changes
+from alerts import AlertSender
+from archive import PageArchive
+from block_detect import BlockStats, PageBlocked, check_response
+from proxy_pool import ProxyPool
+from profiler import CheckProfiler
+from read_api import start_read_api
+from events import get_event_bus
+from config_watch import ConfigWatcher, warn_restart_keys
+from latency import LatencyTracker
+from shared_fetch import get_shared_fetch
+from targeted_parse import extract_filter_counts
+
 
 class SheinMonitor:
     def __init__(self, config_path='config.json'):
@@ -21,6 +35,32 @@ class SheinMonitor:
         self.storage_path = self.config.get('storage_path', 'product_counts.json')
         self.url = self.config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')
         self.check_interval = self.config.get('check_interval_seconds', 300)
+        self.config_watcher = ConfigWatcher(config_path, self.load_config, self.config.get('config_poll_seconds', 5))
+        self.profiler = CheckProfiler(self.config)
+        self.block_stats = BlockStats()
+        self.latency = LatencyTracker(self.config)
+        
+        # Change events for SSE clients and webhooks
+        self.events = get_event_bus(self.config)
+        
+        # Optional local read API serving the latest state from memory
+        self.read_api = None
+        if self.config.get('read_api_port'):
+            self.read_api = start_read_api(
+                self.config['read_api_port'],
+                self.config.get('read_api_host', '127.0.0.1'),
+                self.config.get('read_api_history_size', 500),
+                self.events
+            )
+            stored_data = self.load_stored_counts()
+            if stored_data:
+                self.read_api.update_counts(self.url, stored_data['counts'], stored_data['timestamp'])
+        self.parse_pool = get_parse_pool(self.config.get('parse_pool_workers', 0))
+        self.shared_fetch = get_shared_fetch(self.config)
+        
+        # Page archive and extractor are re-applied when config.json changes
+        self.setup_archive()
+        self.setup_parsing()
         
         # Twilio configuration
         self.twilio_client = Client(
@@ -29,9 +69,18 @@ class SheinMonitor:
         )
         self.twilio_from = self.config['twilio_whatsapp_from']
         self.twilio_to = self.config['twilio_whatsapp_to']
+        self.alert_sender = AlertSender(self.twilio_client, self.twilio_from, self.config)
         
         # Initialize cloudscraper (bypasses Cloudflare and bot detection)
-        self.scraper = cloudscraper.create_scraper(
+        self.scraper = self.create_scraper()
+        
+        # Optional egress proxy pool; each proxy keeps its own sticky session
+        self.proxy_pool = None
+        self.setup_proxies()
+    
+    def create_scraper(self):
+        """Create a cloudscraper session with a desktop Chrome fingerprint"""
+        return cloudscraper.create_scraper(
             browser={
                 'browser': 'chrome',
                 'platform': 'windows',
@@ -56,6 +105,64 @@ class SheinMonitor:
         
         return config
     
+    def setup_archive(self):
+        """Keep every fetched page for offline reparsing"""
+        self.archive = None
+        if self.config.get('archive_dir'):
+            self.archive = PageArchive(
+                self.config['archive_dir'],
+                self.config.get('archive_retention_days', 30),
+                self.config.get('archive_max_bytes')
+            )
+    
+    def setup_parsing(self):
+        """Choose the extractor for parse_mode and facet_rules"""
+        # Facet rules are compiled first, so an invalid rule leaves the current extractor in place
+        facet_rules = self.config.get('facet_rules')
+        text_counts = compile_facet_rules(facet_rules) if facet_rules else TEXT_COUNTS
+        
+        # Parsing mode: 'full' builds the whole soup, 'targeted' streams only the filter subtrees
+        if self.config.get('parse_mode', 'full') == 'targeted':
+            extractor = self.extract_counts_targeted
+            self.extractor_name = 'monitor_simple.extract_counts_targeted'
+        else:
+            extractor = self.extract_counts
+            self.extractor_name = 'monitor_simple.extract_counts'
+        
+        # Facet counts declared in config.json are found in the same text scan as the totals
+        self.extractor = partial(extractor, text_counts=text_counts)
+        # Identifies this extractor and its facet rules when parse results are shared
+        self.parse_key = f"{self.extractor_name}:{json.dumps(facet_rules, sort_keys=True)}"
+    
+    def setup_proxies(self):
+        """Create or update the proxy pool; proxies kept across a reload keep their health and session"""
+        if not self.config.get('proxies'):
+            self.proxy_pool = None
+        elif self.proxy_pool:
+            self.proxy_pool.configure(self.config['proxies'], self.config)
+        else:
+            self.proxy_pool = ProxyPool(self.config['proxies'], self.create_scraper, self.config)
+    
+    def publish_status(self, **status):
+        """Record check health in the read API, with per-proxy health when a pool is in use"""
+        if self.proxy_pool:
+            status['proxies'] = self.proxy_pool.snapshot()
+        self.read_api.update_status(self.url, **status)
+    
+    def apply_config(self, config):
+        """Apply an edited config.json; the warm scraper session is kept as is"""
+        warn_restart_keys(self.config, config)
+        self.config = config
+        self.storage_path = config.get('storage_path', 'product_counts.json')
+        self.url = config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')
+        self.check_interval = config.get('check_interval_seconds', 300)
+        self.twilio_to = config['twilio_whatsapp_to']
+        self.alert_sender.configure(config)
+        self.setup_archive()
+        self.setup_parsing()
+        self.events = get_event_bus(config)
+        self.setup_proxies()
+    
     def load_stored_counts(self):
         """Load previously stored counts from JSON file"""
         if os.path.exists(self.storage_path):
@@ -75,33 +182,28 @@ class SheinMonitor:
     def fetch_page(self):
         """Fetch the Shein category page using cloudscraper"""
         try:
-            response = self.scraper.get(self.url, timeout=30)
+            if self.proxy_pool:
+                response = self.proxy_pool.request(lambda scraper: scraper.get(self.url, timeout=30))
+            else:
+                response = self.scraper.get(self.url, timeout=30)
+            check_response(response)
             response.raise_for_status()
             return response.text
+        except PageBlocked:
+            raise
         except Exception as e:
             print(f"✗ Error fetching page: {e}")
             raise
     
-    def extract_counts(self, html):
-        """Extract product counts from HTML"""
+    @staticmethod
+    def extract_counts(html, text_counts=TEXT_COUNTS):
+        """Extract product counts from HTML; text_counts also carries any compiled facet rules"""
         soup = BeautifulSoup(html, 'html.parser')
-        counts = {}
         
         # Try multiple strategies to extract counts
-        # Strategy 1: Look for total products count
-        total_match = re.search(r'(\d{1,3}(?:,\d{3})*)\s*(?:products|items)', html, re.IGNORECASE)
-        if total_match:
-            counts['total'] = int(total_match.group(1).replace(',', ''))
-        
-        # Strategy 2: Look for gender filters with counts
-        # Search for patterns like "Women (2,914)" or "Men (7)"
-        women_match = re.search(r'Women[^\d]*\((\d{1,3}(?:,\d{3})*)\)', html, re.IGNORECASE)
-        men_match = re.search(r'Men[^\d]*\((\d{1,3}(?:,\d{3})*)\)', html, re.IGNORECASE)
-        
-        if women_match:
-            counts['women'] = int(women_match.group(1).replace(',', ''))
-        if men_match:
-            counts['men'] = int(men_match.group(1).replace(',', ''))
+        # Strategies 1 and 2: the total ("1,234 products"), gender filters such as
+        # "Women (2,914)" or "Men (7)" and every facet rule, in one scan of the text
+        counts = text_counts.scan(html)
         
         # Strategy 3: Parse structured data or JSON-LD
         json_ld_scripts = soup.find_all('script', type='application/ld+json')
@@ -134,6 +236,22 @@ class SheinMonitor:
         
         return counts if counts else None
     
+    @staticmethod
+    def extract_counts_targeted(html, text_counts=TEXT_COUNTS):
+        """Extract product counts, streaming only the JSON-LD and filter subtrees"""
+        # Strategies 1 and 2, with any facet rules, run in one scan of the raw text and need no tree
+        counts = text_counts.scan(html)
+        
+        # Strategies 3 and 4 in a single streaming pass
+        filter_counts, product_items = extract_filter_counts(html, count_pattern=re.compile(r'product|item', re.IGNORECASE))
+        counts.update(filter_counts)
+        
+        # Strategy 5: Count product grid items seen during the same pass
+        if product_items and not counts.get('total'):
+            counts['visible_products'] = product_items
+        
+        return counts if counts else None
+    
     def compare_counts(self, old_counts, new_counts):
         """Compare old and new counts, return changes"""
         changes = {}
@@ -176,33 +294,34 @@ class SheinMonitor:
                 else:
                     message += f"{label}: {value:,}\n"
         
+        message += format_facet_changes(counts, changes)
+        
         message += f"\n🕐 Timestamp: {timestamp}\n"
         message += f"🔗 Source: {self.url}"
         
         return message
     
-    def send_whatsapp_alert(self, message):
-        """Send WhatsApp message via Twilio"""
-        try:
-            msg = self.twilio_client.messages.create(
-                body=message,
-                from_=self.twilio_from,
-                to=self.twilio_to
-            )
-            print(f"✓ WhatsApp alert sent successfully (SID: {msg.sid})")
-            return True
-        except Exception as e:
-            print(f"✗ Failed to send WhatsApp alert: {e}")
-            return False
+    def send_whatsapp_alert(self, message, to=None):
+        """Send WhatsApp message via Twilio to one or more recipients or groups"""
+        return self.alert_sender.send(message, to or self.twilio_to)
     
     def run_once(self):
         """Run a single monitoring check"""
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Checking Shein product counts...")
         
+        self.profiler.begin(self.url)
+        self.latency.begin()
         try:
             # Fetch and parse page
-            html = self.fetch_page()
-            new_counts = self.extract_counts(html)
+            html = self.shared_fetch.fetch('http', self.url, self.fetch_page)
+            self.block_stats.record(None)
+            self.latency.mark('fetched')
+            # The page is archived while the parse pool works on it
+            parsed = self.shared_fetch.parse_async(self.parse_pool, self.extractor, self.parse_key, html)
+            if self.archive and html:
+                self.archive.store(self.url, html)
+            self.profiler.annotate(page_bytes=len(html) if html else 0, extractor=self.extractor_name)
+            new_counts = parsed.result()
             
             if not new_counts:
                 print("✗ Failed to extract product counts from page")
@@ -216,13 +335,18 @@ class SheinMonitor:
             
             # Compare counts
             changes = self.compare_counts(old_counts, new_counts)
+            self.latency.mark('diffed')
             
             if changes:
                 print(f"⚠ Changes detected: {changes}")
+                self.events.publish('counts_changed', {'url': self.url, 'counts': new_counts, 'changes': changes})
                 timestamp = datetime.utcnow().isoformat() + 'Z'
                 message = self.format_whatsapp_message(new_counts, changes, timestamp)
                 print(f"\nWhatsApp message:\n{message}\n")
-                self.send_whatsapp_alert(message)
+                self.latency.mark('queued')
+                if self.send_whatsapp_alert(message):
+                    self.latency.mark('accepted')
+                    self.latency.record(self.url, f"{self.extractor_name} every {self.check_interval}s")
             else:
                 if old_counts:
                     print("✓ No changes detected")
@@ -231,11 +355,23 @@ class SheinMonitor:
             
             # Save new counts
             self.save_counts(new_counts)
+            if self.read_api:
+                self.read_api.update_counts(self.url, new_counts)
+                self.publish_status(last_check=datetime.utcnow().isoformat() + 'Z', block_rate=self.block_stats.rate())
             return True
             
+        except PageBlocked as e:
+            self.block_stats.record(e.kind)
+            if self.read_api:
+                self.publish_status(last_blocked=e.kind, block_rate=self.block_stats.rate())
+            print(f"🛡 Got a {e} instead of the category page, skipping parse and keeping last good state")
+            print(f"🛡 Block rate: {self.block_stats.summary()}")
+            return False
         except Exception as e:
             print(f"✗ Error during monitoring: {e}")
             return False
+        finally:
+            self.profiler.finish()
     
     def run_continuous(self):
         """Run continuous monitoring loop"""
@@ -248,7 +384,7 @@ class SheinMonitor:
         try:
             while True:
                 self.run_once()
-                time.sleep(self.check_interval)
+                self.config_watcher.wait(lambda: self.check_interval, self.apply_config)
         except KeyboardInterrupt:
             print("\n\n👋 Monitoring stopped by user")
 
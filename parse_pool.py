@@ -0,0 +1,70 @@
+"""
+Process pool for HTML extraction
+Moves BeautifulSoup parsing into worker processes so it can use every core, and hands
+back futures so callers can keep fetching or archiving while a page is parsed
+"""
+
+import atexit
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+_pools = {}
+
+
+def _run_extractor(extractor, page):
+    """Worker entry point: decode the raw page and return only the extracted result"""
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', errors='replace')
+    return extractor(page)
+
+
+class ParsePool:
+    """Runs module-level extractors either inline or in a shared process pool"""
+
+    def __init__(self, workers=0):
+        self.workers = workers
+        self.executor = None
+        if workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, extractor, page):
+        """Queue a page for parsing and return a future with the extractor result"""
+        return self.executor.submit(_run_extractor, extractor, page)
+
+    def parse_async(self, extractor, page):
+        """Start parsing a page and return a future for the result
+
+        Without worker processes the page is parsed right away and the future is
+        already done.
+        """
+        if self.executor is None or page is None:
+            future = Future()
+            try:
+                future.set_result(extractor(page))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self.submit(extractor, page)
+
+    def parse(self, extractor, page):
+        """Parse a page and block the calling thread until the result is back"""
+        return self.parse_async(extractor, page).result()
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+def get_parse_pool(workers=0):
+    """Return the process-wide pool for the given worker count"""
+    if workers not in _pools:
+        _pools[workers] = ParsePool(workers)
+    return _pools[workers]
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
@@ -0,0 +1,101 @@
+"""
+Compact product records
+Products are kept as slotted objects with an integer ID, a URL path relative to the
+shared site prefix, interned prices and an epoch timestamp, and convert to and from
+the original JSON layout on demand
+"""
+
+from datetime import datetime, timezone
+import sys
+import time
+
+
+BASE_URL = 'https://www.sheinindia.in'
+
+
+class Product:
+    """One tracked product; reads like the old product dict via product['key']"""
+
+    __slots__ = ('id', 'name', 'path', 'price', 'detected', 'extra')
+
+    def __init__(self, product_id, name, url, price, detected=None, extra=None):
+        self.id = int(product_id)
+        self.name = name
+        self.path = url[len(BASE_URL):] if url.startswith(BASE_URL) else url
+        # Prices repeat across thousands of products; keep one copy of each
+        self.price = sys.intern(price)
+        self.detected = time.time() if detected is None else detected
+        self.extra = extra
+
+    @property
+    def url(self):
+        return self.path if self.path.startswith('http') else BASE_URL + self.path
+
+    @property
+    def detected_at(self):
+        return datetime.fromtimestamp(self.detected, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return str(self.id)
+        if key in ('name', 'url', 'price', 'detected_at'):
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        # Enrichment fields (sizes, in_stock, ...) are rare and live in a side dict
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in ('id', 'name', 'url', 'price', 'detected_at') or bool(self.extra and key in self.extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """The original JSON layout of a product"""
+        data = {
+            'id': str(self.id),
+            'name': self.name,
+            'url': self.url,
+            'price': self.price,
+            'detected_at': self.detected_at
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from the JSON layout (stored products, in-browser extraction)"""
+        extra = {k: v for k, v in data.items() if k not in ('id', 'name', 'url', 'price', 'detected_at')}
+        detected = None
+        if data.get('detected_at'):
+            detected = datetime.fromisoformat(data['detected_at'].replace('Z', '+00:00')).timestamp()
+        return cls(data['id'], data.get('name', 'Unknown Product'), data.get('url', ''), data.get('price', 'N/A'),
+                   detected, extra or None)
+
+    def __repr__(self):
+        return f"Product({self.id}, {self.name!r}, {self.price!r})"
+
+
+def compact_products(products):
+    """Convert {'men': [dict, ...], ...} to Product records, leaving records as they are"""
+    return {
+        category: [p if isinstance(p, Product) else Product.from_dict(p) for p in items]
+        for category, items in products.items()
+    }
+
+
+def json_default(obj):
+    """json.dump(default=...) hook that writes Product records in the original layout"""
+    if isinstance(obj, Product):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+On-demand profiling of individual monitor checks
+Records the next N checks for a URL as flamegraph-compatible folded stacks
+"""
+
+from contextlib import contextmanager
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Only threads of one process are serialized on platforms without fcntl
+    fcntl = None
+
+
+DEFAULT_REQUEST_PATH = 'profile_request.json'
+DEFAULT_OUTPUT_DIR = 'profiles'
+
+_request_lock = threading.Lock()
+
+
+class StackSampler:
+    """Wall-clock sampler that folds the stacks of a single thread"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in a background thread"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                names.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            key = ';'.join(reversed(names))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def write_folded(self, path):
+        """Write samples in the folded format understood by flamegraph.pl and speedscope"""
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class CheckProfiler:
+    """Profiles requested run_once calls and writes the results to disk"""
+
+    def __init__(self, config):
+        self.request_path = config.get('profile_request_path', DEFAULT_REQUEST_PATH)
+        self.output_dir = config.get('profile_output_dir', DEFAULT_OUTPUT_DIR)
+        self.mode = config.get('profile_mode', 'sample')
+        self.interval = config.get('profile_interval_ms', 5) / 1000.0
+        self.active = None
+
+    def load_requests(self):
+        """Load pending profile requests"""
+        if os.path.exists(self.request_path):
+            try:
+                with open(self.request_path, 'r') as f:
+                    return json.load(f).get('requests', [])
+            except (OSError, ValueError):
+                return []
+        return []
+
+    def save_requests(self, requests):
+        """Save pending profile requests, removing the file when none are left
+
+        The file is replaced atomically, so a reader never sees it half-written.
+        """
+        if not requests:
+            if os.path.exists(self.request_path):
+                os.remove(self.request_path)
+            return
+        tmp_path = f"{self.request_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'requests': requests}, f, indent=2)
+        os.replace(tmp_path, self.request_path)
+
+    @contextmanager
+    def locked(self):
+        """Hold the request file lock across threads and processes for a read-modify-write"""
+        with _request_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.request_path + '.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    def claim(self, url):
+        """Consume one pending profile request for this URL, if any"""
+        # Checked on every check, so skip the lock while nothing is requested
+        if not os.path.exists(self.request_path):
+            return False
+        with self.locked():
+            requests = self.load_requests()
+            for request in requests:
+                if request.get('url') == url and request.get('remaining', 0) > 0:
+                    request['remaining'] -= 1
+                    self.save_requests([r for r in requests if r.get('remaining', 0) > 0])
+                    return True
+        return False
+
+    def begin(self, url):
+        """Start profiling this check if a request for the URL is pending"""
+        self.active = None
+        if not self.claim(url):
+            return
+        session = {
+            'url': url,
+            'mode': self.mode,
+            'started_at': datetime.utcnow().isoformat() + 'Z',
+            'start': time.perf_counter(),
+            'meta': {},
+        }
+        if self.mode == 'cprofile':
+            session['profiler'] = cProfile.Profile()
+            session['profiler'].enable()
+        else:
+            session['profiler'] = StackSampler(threading.get_ident(), self.interval)
+            session['profiler'].start()
+        self.active = session
+        print(f"🔬 Profiling this check ({self.mode})")
+
+    def annotate(self, **meta):
+        """Attach metadata such as page size and extractor path to the running profile"""
+        if self.active:
+            self.active['meta'].update(meta)
+
+    def finish(self):
+        """Stop the running profile, if any, and write it out"""
+        session = self.active
+        self.active = None
+        if not session:
+            return None
+
+        profiler = session['profiler']
+        if session['mode'] == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        base = os.path.join(self.output_dir, f"check-{stamp}")
+        if session['mode'] == 'cprofile':
+            profile_path = base + '.prof'
+            profiler.dump_stats(profile_path)
+        else:
+            profile_path = base + '.folded'
+            profiler.write_folded(profile_path)
+
+        meta = {
+            'url': session['url'],
+            'mode': session['mode'],
+            'started_at': session['started_at'],
+            'duration_seconds': round(time.perf_counter() - session['start'], 4),
+            'profile': os.path.basename(profile_path),
+        }
+        if session['mode'] != 'cprofile':
+            meta['samples'] = profiler.samples
+        meta.update(session['meta'])
+        with open(base + '.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        print(f"✓ Profile written to {profile_path}")
+        return profile_path
+
+
+def request_profile(url, checks, request_path=DEFAULT_REQUEST_PATH):
+    """Ask running monitors to profile the next N checks of a URL"""
+    profiler = CheckProfiler({'profile_request_path': request_path})
+    with profiler.locked():
+        requests = [r for r in profiler.load_requests() if r.get('url') != url]
+        requests.append({'url': url, 'remaining': checks})
+        profiler.save_requests(requests)
+
+
+def main():
+    """Command line entry point: profiler.py URL [N]"""
+    if len(sys.argv) < 2:
+        print("Usage: python3 profiler.py URL [CHECKS]")
+        sys.exit(1)
+    url = sys.argv[1]
+    checks = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    request_profile(url, checks)
+    print(f"✓ Next {checks} check(s) of {url} will be profiled")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Egress proxy pool
+Spreads fetches over a pool of proxies with per-proxy success, latency and block
+scoring; each proxy keeps its own sticky session and cookies, and blocked proxies
+cool down before being used again
+"""
+
+import random
+import threading
+import time
+
+from block_detect import classify_response, HEAD_BYTES
+
+
+class NoProxyAvailable(Exception):
+    """Raised when every proxy in the pool is cooling down"""
+
+
+class ProxyState:
+    """Health of one egress proxy and the session bound to it"""
+
+    def __init__(self, url):
+        self.url = url
+        self.scraper = None
+        self.success = 1.0
+        self.latency = 1.0
+        self.requests = 0
+        self.blocks = 0
+        self.consecutive_blocks = 0
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+        self.in_use = False
+
+    def score(self):
+        """Higher is healthier: smoothed success rate discounted by latency"""
+        return max(self.success, 0.01) / (1.0 + self.latency)
+
+    def snapshot(self):
+        return {
+            'proxy': self.url,
+            'score': round(self.score(), 3),
+            'success': round(self.success, 3),
+            'latency_seconds': round(self.latency, 3),
+            'requests': self.requests,
+            'blocks': self.blocks,
+            'cooling_down': self.cooldown_until > time.time(),
+        }
+
+
+class ProxyPool:
+    """Chooses a healthy proxy per request and keeps its session sticky"""
+
+    def __init__(self, proxies, scraper_factory, config):
+        self.states = []
+        self.scraper_factory = scraper_factory
+        self.alpha = 0.2
+        self.lock = threading.Lock()
+        self.configure(proxies, config)
+
+    def configure(self, proxies, config):
+        """Set the proxy list and tuning; proxies that stay keep their health and session"""
+        with self.lock:
+            existing = {s.url: s for s in self.states}
+            self.states = [existing.get(url) or ProxyState(url) for url in proxies]
+            self.min_interval = config.get('proxy_min_interval_seconds', 0)
+            self.cooldown = config.get('proxy_cooldown_seconds', 120)
+            self.max_cooldown = config.get('proxy_max_cooldown_seconds', 3600)
+            self.attempts = max(1, config.get('proxy_attempts', 3))
+
+    def session(self, state):
+        """The sticky session for a proxy, created on first use"""
+        if state.scraper is None:
+            state.scraper = self.scraper_factory()
+            state.scraper.proxies = {'http': state.url, 'https': state.url}
+        return state.scraper
+
+    def acquire(self, exclude=()):
+        """Pick an idle, rested proxy that is not cooling down, favouring healthy ones"""
+        with self.lock:
+            now = time.time()
+            ready = [
+                s for s in self.states
+                if not s.in_use and s.cooldown_until <= now and now - s.last_used >= self.min_interval
+                and s.url not in exclude
+            ]
+            if not ready:
+                raise NoProxyAvailable("all proxies are busy or cooling down")
+            state = random.choices(ready, weights=[s.score() for s in ready])[0]
+            state.in_use = True
+            state.last_used = now
+            return state
+
+    def release(self, state, response, elapsed):
+        """Update a proxy's health from the outcome of its request; returns True when the proxy failed it"""
+        with self.lock:
+            state.in_use = False
+            state.requests += 1
+            kind = None
+            if response is not None:
+                kind = classify_response(response.status_code, response.headers, response.text[:HEAD_BYTES])
+            ok = response is not None and kind is None and response.status_code < 400
+            state.success = (1 - self.alpha) * state.success + self.alpha * (1.0 if ok else 0.0)
+            state.latency = (1 - self.alpha) * state.latency + self.alpha * elapsed
+            if kind:
+                state.blocks += 1
+                state.consecutive_blocks += 1
+                cooldown = min(self.cooldown * 2 ** (state.consecutive_blocks - 1), self.max_cooldown)
+                state.cooldown_until = time.time() + cooldown
+                # A blocked proxy's cookies are burnt; start a fresh session after the cooldown
+                state.scraper = None
+                print(f"🛡 Proxy {state.url} got a {kind} page, cooling down for {cooldown:.0f}s")
+            elif ok:
+                state.consecutive_blocks = 0
+            # Errors, blocks and server errors may pass on another proxy; a 404 would not
+            return not ok and (response is None or kind is not None or response.status_code >= 500)
+
+    def request(self, fetch):
+        """Run fetch(scraper) through a chosen proxy and score the proxy on the result
+
+        A request that errors, is blocked or gets a server error is retried through
+        another proxy within the same check, up to `proxy_attempts` proxies. The last
+        response is returned, or its error raised, so the caller still sees the block.
+        """
+        tried = set()
+        response = error = None
+        for attempt in range(self.attempts):
+            try:
+                state = self.acquire(exclude=tried)
+            except NoProxyAvailable:
+                if not tried:
+                    raise
+                break
+            tried.add(state.url)
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = fetch(self.session(state))
+            except Exception as e:
+                error = e
+            if not self.release(state, response, time.monotonic() - started):
+                break
+            if attempt + 1 < self.attempts:
+                print(f"🛡 Proxy {state.url} failed, retrying through another proxy")
+        if error is not None:
+            raise error
+        return response
+
+    def snapshot(self):
+        """Health of every proxy, for logging or metrics"""
+        with self.lock:
+            return [s.snapshot() for s in self.states]
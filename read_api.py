@@ -0,0 +1,164 @@
+"""
+Local read API
+Serves the latest counts, count history and tracked products from an in-memory
+snapshot over HTTP, with ETag/304 and gzip, so dashboards never touch disk or Shein
+"""
+
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import gzip
+import hashlib
+import json
+import threading
+
+from product_record import json_default
+
+
+class Resource:
+    """One pre-serialized JSON document with its ETag and gzip body"""
+
+    def __init__(self, data):
+        self.body = json.dumps(data, ensure_ascii=False, default=json_default).encode('utf-8')
+        digest = hashlib.sha1(self.body).hexdigest()
+        # Each encoding is a different representation, so it gets its own ETag
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+        self.gzipped = gzip.compress(self.body, compresslevel=6)
+
+
+class Snapshot:
+    """Latest monitor state per category URL; readers get immutable pre-encoded resources"""
+
+    def __init__(self, history_size=500):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.products = {}
+        self.status = {}
+        self.history = {}
+        self.history_size = history_size
+        self.resources = {}
+        for name in ('counts', 'products', 'status', 'history'):
+            self.resources[name] = Resource({})
+
+    def _publish(self, name, data):
+        # Serialize once per update so every poll is just a dict lookup
+        self.resources[name] = Resource(data)
+
+    def update_counts(self, url, counts, timestamp=None):
+        """Record the latest counts for a category and append them to its history"""
+        entry = {'counts': counts, 'timestamp': timestamp or datetime.utcnow().isoformat() + 'Z'}
+        with self.lock:
+            self.counts[url] = entry
+            self.history.setdefault(url, deque(maxlen=self.history_size)).append(entry)
+            self._publish('counts', self.counts)
+            self._publish('history', {u: list(h) for u, h in self.history.items()})
+
+    def update_products(self, url, products, timestamp=None):
+        """Record the latest tracked products for a category"""
+        entry = dict(products, timestamp=timestamp or datetime.utcnow().isoformat() + 'Z')
+        with self.lock:
+            self.products[url] = entry
+            self._publish('products', self.products)
+
+    def update_status(self, url, **status):
+        """Record check health (block rate, last check time, ...) for a category"""
+        with self.lock:
+            self.status.setdefault(url, {}).update(status)
+            self._publish('status', self.status)
+
+    def get(self, name):
+        return self.resources.get(name)
+
+
+class ReadHandler(BaseHTTPRequestHandler):
+    """GET /counts, /history, /products, /status and the /events SSE stream"""
+
+    snapshot = None
+    events = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == '/events' and self.events is not None:
+            self.stream_events(parse_qs(parsed.query))
+            return
+        resource = self.snapshot.get(parsed.path.strip('/') or 'counts')
+        if resource is None:
+            self.send_error(404)
+            return
+
+        url = parse_qs(parsed.query).get('url', [None])[0]
+        if url is not None:
+            # Filtered views are rare; build them on demand
+            data = json.loads(resource.body).get(url)
+            if data is None:
+                self.send_error(404)
+                return
+            resource = Resource(data)
+
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        etag = resource.gzip_etag if use_gzip else resource.etag
+        if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        body = resource.gzipped if use_gzip else resource.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, query):
+        """Server-sent events, resuming after Last-Event-ID (or ?cursor=) when given"""
+        cursor = self.headers.get('Last-Event-ID') or query.get('cursor', [''])[0]
+        cursor = int(cursor) if cursor.isdigit() else self.events.last_id
+        url = query.get('url', [None])[0]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            while True:
+                events, missed = self.events.wait_since(cursor, timeout=15)
+                chunk = ''
+                if missed:
+                    chunk += f"event: gap\ndata: {json.dumps({'after': cursor})}\n\n"
+                for event in events:
+                    cursor = event['id']
+                    if url is not None and event['data'].get('url') != url:
+                        continue
+                    chunk += f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=json_default)}\n\n"
+                self.wfile.write((chunk or ': keepalive\n\n').encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        pass
+
+
+_servers = {}
+
+
+def start_read_api(port, host='127.0.0.1', history_size=500, events=None):
+    """Start (once per port) the read API in a background thread and return its Snapshot"""
+    if port not in _servers:
+        snapshot = Snapshot(history_size)
+        handler = type('BoundReadHandler', (ReadHandler,), {'snapshot': snapshot, 'events': events})
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"✓ Read API listening on http://{host}:{port}")
+        _servers[port] = (server, snapshot)
+    return _servers[port][1]
@@ -0,0 +1,242 @@
+"""
+Shared fetch layer
+Coalesces concurrent fetches and parses of the same category page into a single call
+(single-flight) and keeps the result for a short TTL, within a process and, with
+shared_fetch_dir set, across monitor processes on the same host. Parsed results are
+handed out as private copies, since callers enrich and mutate them
+"""
+
+from concurrent.futures import Future
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Cross-process coalescing is disabled on platforms without fcntl
+    fcntl = None
+
+
+def freeze(value):
+    """Form of a result that is safe to share: pages are immutable strings, anything else is pickled"""
+    if value is None or isinstance(value, str):
+        return value
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def thaw(frozen):
+    """A private copy of a frozen result"""
+    return pickle.loads(frozen) if isinstance(frozen, bytes) else frozen
+
+
+def resolved(value):
+    """A future that already holds value"""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def thawed(shared):
+    """A future for a private copy of the frozen result of another future"""
+    future = Future()
+
+    def done(shared):
+        error = shared.exception()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(thaw(shared.result()))
+
+    shared.add_done_callback(done)
+    return future
+
+
+class SharedFetch:
+    """Runs produce() once per key for every caller that asks within the TTL"""
+
+    def __init__(self, ttl=15, cache_dir=None):
+        self.ttl = ttl
+        self.cache_dir = cache_dir if fcntl else None
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.inflight = {}
+        self.hits = 0
+        self.swept_at = time.time()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def count_hit(self):
+        with self.lock:
+            self.hits += 1
+
+    def get(self, key, produce):
+        """Return the cached or in-flight result for key, or compute it with produce()"""
+        with self.lock:
+            now = time.time()
+            entry = self.cache.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return thaw(entry[1])
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[key] = future
+            else:
+                self.hits += 1
+        if not owner:
+            # Another consumer is already fetching this page; share its result
+            return thaw(future.result())
+
+        try:
+            value = self.produce_shared(key, produce) if self.cache_dir else produce()
+        except BaseException as e:
+            # Failures are shared with the current waiters but never cached
+            with self.lock:
+                del self.inflight[key]
+            future.set_exception(e)
+            raise
+
+        # The caller keeps value; everyone else gets copies of the frozen form
+        frozen = freeze(value)
+        with self.lock:
+            del self.inflight[key]
+            if value is not None and self.ttl:
+                now = time.time()
+                self.cache = {k: v for k, v in self.cache.items() if v[0] > now}
+                self.cache[key] = (now + self.ttl, frozen)
+        future.set_result(frozen)
+        return value
+
+    def peek(self, key):
+        """The fresh cached result for key, or None"""
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry and entry[0] > time.time():
+                return thaw(entry[1])
+        if self.cache_dir:
+            path = self.cache_path(key)
+            try:
+                if time.time() - os.path.getmtime(path) < self.ttl:
+                    with open(path, 'rb') as f:
+                        return pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+        return None
+
+    def fetch(self, kind, url, fetch, reuse=()):
+        """Fetch a page once for every consumer of the same URL and fetch kind
+
+        reuse lists other kinds whose fresh page is good enough for this consumer
+        (a scrolled grid also serves a plain page load).
+        """
+        for other in reuse:
+            page = self.peek(('page', other, url))
+            if page is not None:
+                self.count_hit()
+                return page
+        return self.get(('page', kind, url), fetch)
+
+    def parse(self, parse_pool, extractor, parse_key, page):
+        """Parse a page once per extractor and page content, sharing the result"""
+        if not page:
+            return parse_pool.parse(extractor, page)
+        digest = hashlib.sha1(page.encode('utf-8', errors='replace')).hexdigest()
+        return self.get(('parse', parse_key, digest), lambda: parse_pool.parse(extractor, page))
+
+    def cache_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+
+    def parse_async(self, parse_pool, extractor, parse_key, page):
+        """parse() that returns a future, so the caller can archive or fetch while the page is parsed
+
+        Consumers of the same page in this process share one in-flight parse. With
+        shared_fetch_dir set the parse is coordinated through the file lock and runs
+        synchronously.
+        """
+        if not page or self.cache_dir:
+            return resolved(self.parse(parse_pool, extractor, parse_key, page))
+        key = ('parse', parse_key, hashlib.sha1(page.encode('utf-8', errors='replace')).hexdigest())
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry and entry[0] > time.time():
+                self.hits += 1
+                return resolved(thaw(entry[1]))
+            shared = self.inflight.get(key)
+            if shared is not None:
+                self.hits += 1
+                return thawed(shared)
+            shared = Future()
+            self.inflight[key] = shared
+
+        def finish(parsed):
+            error = parsed.exception()
+            frozen = freeze(parsed.result()) if error is None else None
+            with self.lock:
+                del self.inflight[key]
+                if frozen is not None and self.ttl:
+                    now = time.time()
+                    self.cache = {k: v for k, v in self.cache.items() if v[0] > now}
+                    self.cache[key] = (now + self.ttl, frozen)
+            if error is not None:
+                shared.set_exception(error)
+            else:
+                shared.set_result(frozen)
+
+        parse_pool.parse_async(extractor, page).add_done_callback(finish)
+        return thawed(shared)
+
+    def produce_shared(self, key, produce):
+        """Cross-process single-flight: one process produces under a file lock, the rest reuse its result"""
+        path = self.cache_path(key)
+        with open(path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if time.time() - os.path.getmtime(path) < self.ttl:
+                    with open(path, 'rb') as f:
+                        value = pickle.load(f)
+                    self.count_hit()
+                    return value
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            value = produce()
+            if value is not None and self.ttl:
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+        self.sweep()
+        return value
+
+    def sweep(self):
+        """Delete expired cache files, at most once per TTL (parse results are keyed by page hash)"""
+        now = time.time()
+        with self.lock:
+            if now - self.swept_at < max(self.ttl, 60):
+                return
+            self.swept_at = now
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            # Lock files are kept longer so a process waiting on one never races a new one
+            max_age = self.ttl * 10 if name.endswith('.lock') else max(self.ttl, 60)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+_shared = None
+
+
+def get_shared_fetch(config):
+    """Return the process-wide shared fetch layer"""
+    global _shared
+    if _shared is None:
+        _shared = SharedFetch(
+            config.get('shared_fetch_ttl_seconds', 15),
+            config.get('shared_fetch_dir')
+        )
+    return _shared
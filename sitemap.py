@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Sitemap product discovery
+Streams the storefront's product sitemaps through an incremental XML parser and
+reports `-p-<id>` products that are not tracked yet, refetching only the shards whose
+<lastmod> (or ETag) changed since the last scan, in constant memory
+"""
+
+from itertools import chain
+from urllib.parse import urlparse
+import json
+import os
+import sys
+import time
+import zlib
+
+import cloudscraper
+from lxml import etree
+
+from block_detect import HEAD_BYTES, PageBlocked, classify_response
+from product_record import Product
+from targeted_parse import PRODUCT_ID_RE
+from watch_rules import is_mens_text
+
+try:
+    import fcntl
+except ImportError:  # Concurrent workers may scan at the same time on platforms without fcntl
+    fcntl = None
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_entries(chunks):
+    """Yield (kind, loc, lastmod) for every <sitemap> or <url> entry in a streamed document
+
+    kind is 'sitemap' for index entries and 'url' for page entries; gzipped documents
+    are decompressed on the fly.
+    """
+    parser = etree.XMLPullParser(events=('end',), recover=True, huge_tree=True)
+    decompressor = None
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if first:
+            first = False
+            if chunk[:2] == b'\x1f\x8b':
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+        yield from _drain(parser)
+    if decompressor:
+        parser.feed(decompressor.flush())
+    parser.close()
+    yield from _drain(parser)
+
+
+def _drain(parser):
+    for _, elem in parser.read_events():
+        kind = local_name(elem.tag) if isinstance(elem.tag, str) else None
+        if kind not in ('sitemap', 'url'):
+            continue
+        loc = lastmod = None
+        for child in elem:
+            name = local_name(child.tag) if isinstance(child.tag, str) else None
+            if name == 'loc':
+                loc = (child.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = (child.text or '').strip()
+        # Drop the finished entry and everything before it so memory stays flat
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+        if loc:
+            yield kind, loc, lastmod
+
+
+def peek_head(chunk):
+    """Text of the first chunk for block detection, gunzipping a compressed sitemap"""
+    if chunk[:2] == b'\x1f\x8b':
+        try:
+            chunk = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(chunk, HEAD_BYTES)
+        except zlib.error:
+            return ''
+    return chunk[:HEAD_BYTES].decode('utf-8', errors='replace')
+
+
+def product_from_url(url, lastmod=None):
+    """Return (Product, is_men) for a product page URL, or (None, False) for other pages"""
+    page = urlparse(url).path.rsplit('/', 1)[-1]
+    match = PRODUCT_ID_RE.search(page)
+    if not match:
+        return None, False
+    name = page[:match.start()].replace('-', ' ').strip().title() or 'Unknown Product'
+    product = Product(match.group(1), name[:100], url, 'N/A')
+    if lastmod:
+        product['listed_at'] = lastmod
+    return product, is_mens_text(name.lower())
+
+
+class SitemapScanner:
+    """Remembers shard lastmods/ETags and seen product IDs between scans
+
+    The state file is shared by every worker on the host; one scan runs at a time and
+    starts from the state the previous one saved, so an arrival is reported once.
+    """
+
+    def __init__(self, config):
+        self.index_url = config.get('sitemap_url', 'https://www.sheinindia.in/sitemap.xml')
+        self.shard_filter = config.get('sitemap_shard_filter', 'product')
+        self.state_path = config.get('sitemap_state_path', 'sitemap_state.json')
+        self.scraper = None
+        self.shards = {}
+        self.seen_ids = set()
+        self.seeded = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠ Ignoring unreadable sitemap state {self.state_path}")
+            return
+        self.shards = state.get('shards', {})
+        self.seen_ids = set(state.get('seen_ids', []))
+        self.seeded = state.get('seeded', False)
+
+    def save(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'shards': self.shards, 'seen_ids': sorted(self.seen_ids), 'seeded': self.seeded}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def lock(self):
+        """Take the scan lease without waiting; returns the open lock file, or None if another worker holds it"""
+        lock_file = open(self.state_path + '.lock', 'w')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def session(self):
+        if self.scraper is None:
+            self.scraper = cloudscraper.create_scraper(
+                browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
+            )
+        return self.scraper
+
+    def stream(self, url, etag=None):
+        """Open a streamed response as (response, chunks); None when the document is unchanged
+
+        Block pages are recognised from the status, headers and the first chunk alone, so
+        the body is never buffered; chunks replays that chunk before the rest of the body.
+        """
+        headers = {'If-None-Match': etag} if etag else {}
+        response = self.session().get(url, headers=headers, timeout=60, stream=True)
+        if response.status_code == 304:
+            response.close()
+            return None
+        try:
+            body = response.iter_content(CHUNK_SIZE)
+            first = next(body, b'')
+            kind = classify_response(response.status_code, response.headers, peek_head(first))
+            if kind:
+                raise PageBlocked(kind, response.status_code)
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return response, chain([first], body)
+
+    def changed_shards(self):
+        """Product sitemap shards from the index whose lastmod differs from the last scan"""
+        response, chunks = self.stream(self.index_url)
+        shards = []
+        try:
+            for kind, loc, lastmod in iter_entries(chunks):
+                if kind == 'url':
+                    # Not an index: the document itself lists the products
+                    return [(self.index_url, None)]
+                if self.shard_filter and self.shard_filter not in loc:
+                    continue
+                previous = self.shards.get(loc, {})
+                if lastmod is None or previous.get('lastmod') != lastmod:
+                    shards.append((loc, lastmod))
+        finally:
+            response.close()
+        return shards
+
+    def scan(self, known_ids=()):
+        """Return {'men': [...], 'women': [...]} of products not seen before
+
+        known_ids (e.g. the grid monitor's tracked IDs) are treated as seen. Until one
+        scan has read every shard, scans only record what is already listed, so a shard
+        that failed while seeding is not reported as new arrivals later. Returns nothing
+        while another worker is scanning.
+        """
+        lock_file = self.lock()
+        if lock_file is None:
+            print("🗺 Another worker is scanning the sitemaps, skipping")
+            return {'men': [], 'women': []}
+        try:
+            # Start from what the last scan, possibly in another worker, saved
+            self.load()
+            return self.scan_locked(known_ids)
+        finally:
+            lock_file.close()
+
+    def scan_locked(self, known_ids):
+        seeding = not self.seeded
+        known = self.seen_ids
+        known.update(int(product_id) for product_id in known_ids)
+        found = {'men': [], 'women': []}
+
+        started = time.time()
+        shards = self.changed_shards()
+        failed = 0
+        for loc, lastmod in shards:
+            previous = self.shards.get(loc, {})
+            etag = previous.get('etag')
+            try:
+                opened = self.stream(loc, etag)
+                if opened is not None:
+                    response, chunks = opened
+                    try:
+                        for kind, url, url_lastmod in iter_entries(chunks):
+                            product, is_men = product_from_url(url, url_lastmod)
+                            if product is None or product.id in known:
+                                continue
+                            known.add(product.id)
+                            if not seeding:
+                                found['men' if is_men else 'women'].append(product)
+                    finally:
+                        response.close()
+                    etag = response.headers.get('ETag')
+            except Exception as e:
+                # Leave the shard's old lastmod in place so the next scan retries it
+                print(f"✗ Could not read sitemap shard {loc}: {e}")
+                failed += 1
+                continue
+            self.shards[loc] = {'lastmod': lastmod, 'etag': etag}
+
+        if seeding and not failed:
+            self.seeded = True
+        elif seeding:
+            print(f"⚠ Sitemap seeding incomplete ({failed} shards failed), the next scan keeps seeding")
+        self.save()
+        total = len(found['men']) + len(found['women'])
+        print(f"🗺 Sitemap scan: {len(shards)} changed shards, {total} new products in {time.time() - started:.1f}s")
+        return found
+
+
+def main():
+    """Command line entry point: sitemap.py [config.json] -- scan once and print new products"""
+    config_path = sys.argv[1] if len(sys.argv) > 1 else 'config.json'
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    found = SitemapScanner(config).scan()
+    for category, products in found.items():
+        for product in products:
+            print(f"{category}\t{product['id']}\t{product['url']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Memory-bounded targeted parsing
+Streams the page through lxml and only keeps product-card and filter subtrees alive,
+discarding everything else as soon as it has been seen
+"""
+
+from lxml import etree
+import json
+import re
+import time
+
+from watch_rules import is_mens_text
+from product_record import Product
+
+
+CHUNK_SIZE = 64 * 1024
+PRODUCT_CLASS_RE = re.compile(r'product|goods-item|S-product', re.IGNORECASE)
+TITLE_CLASS_RE = re.compile(r'title|name', re.IGNORECASE)
+PRICE_CLASS_RE = re.compile(r'price', re.IGNORECASE)
+PRODUCT_ID_RE = re.compile(r'-p-(\d+)')
+FILTER_TEXT_RE = re.compile(r'(Women|Men)\s*\(\d+\)')
+COUNT_RE = re.compile(r'\((\d{1,3}(?:,\d{3})*)\)')
+
+
+def _discard(elem):
+    """Free an element and any already-processed siblings before it"""
+    elem.clear()
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def iter_subtrees(html, is_root, on_end=None, accept=None, chunk_size=CHUNK_SIZE):
+    """Yield each innermost element matched by is_root(tag, attrib) once it is complete.
+
+    Matches may nest, e.g. a `product-list` container around `product-card`s. A finished
+    match is yielded when accept(elem) holds (always, if accept is None) and none of its
+    nested matches was yielded; enclosing matches of a yielded element are containers
+    and are never yielded themselves. Yielded subtrees and elements outside any match
+    are discarded (the latter after on_end, if given), so the live tree holds only the
+    current card and its ancestors.
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    open_roots = []  # [element, is_container] for every match that is still open
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        for event, elem in parser.read_events():
+            if not isinstance(elem.tag, str):
+                continue
+            if event == 'start':
+                if is_root(elem.tag, elem.attrib):
+                    open_roots.append([elem, False])
+            elif open_roots and open_roots[-1][0] is elem:
+                _, is_container = open_roots.pop()
+                if not is_container and (accept is None or accept(elem)):
+                    yield elem
+                    for entry in open_roots:
+                        entry[1] = True
+                    _discard(elem)
+                elif is_container or not open_roots:
+                    _discard(elem)
+                # Otherwise it is part of an enclosing match and stays until that one ends
+            elif not open_roots:
+                if on_end is not None:
+                    on_end(elem)
+                _discard(elem)
+    parser.close()
+
+
+def _find(elem, tags, class_re):
+    for child in elem.iterdescendants(*tags):
+        if class_re.search(child.get('class', '')):
+            return child
+    return None
+
+
+def _text(elem):
+    return ''.join(elem.itertext())
+
+
+def is_product_card(tag, attrib):
+    """Whether a start tag opens a product card"""
+    return tag in ('article', 'div') and bool(PRODUCT_CLASS_RE.search(attrib.get('class', '')))
+
+
+def product_link(card):
+    """The first link in a card that points at a product page (`-p-<id>`), or None"""
+    return next((a for a in card.iterdescendants('a') if PRODUCT_ID_RE.search(a.get('href') or '')), None)
+
+
+def product_from_card(card, detected=None):
+    """Return (product_info, is_men) for a card; product_info is None when it has no product link"""
+    link_tag = product_link(card)
+    if link_tag is None:
+        return None, False
+
+    product_url = link_tag.get('href')
+    product_id_match = PRODUCT_ID_RE.search(product_url)
+
+    title_tag = _find(card, ('h2', 'h3', 'div'), TITLE_CLASS_RE)
+    product_name = _text(title_tag).strip() if title_tag is not None else 'Unknown Product'
+
+    price_tag = _find(card, ('span', 'div'), PRICE_CLASS_RE)
+    price = _text(price_tag).strip() if price_tag is not None else 'N/A'
+
+    product_text = _text(card).lower()
+    is_men = is_mens_text(product_text)
+
+    product_info = Product(product_id_match.group(1), product_name[:100], product_url, price, detected)
+    return product_info, is_men
+
+
+def extract_products(html):
+    """Extract product details while only materializing one product card at a time"""
+    products = {'men': [], 'women': []}
+    cards = 0
+    detected = time.time()
+    for card in iter_subtrees(html, is_product_card, accept=lambda elem: product_link(elem) is not None):
+        cards += 1
+        try:
+            product_info, is_men = product_from_card(card, detected)
+        except Exception as e:
+            print(f"Error parsing product element: {e}")
+            continue
+        if product_info is None:
+            continue
+        if is_men:
+            products['men'].append(product_info)
+        else:
+            products['women'].append(product_info)
+
+    print(f"Found {cards} product cards (targeted parse)")
+    print(f"✓ Extracted {len(products['men'])} men's products, {len(products['women'])} women's products")
+    return products
+
+
+def extract_filter_counts(html, count_pattern=None):
+    """Collect JSON-LD totals and filter-label counts in one streaming pass.
+
+    Returns (counts, matched) where matched is the number of article/div elements whose
+    class matches count_pattern (0 when no pattern is given).
+    """
+    counts = {}
+    matched = [0]
+
+    def on_end(elem):
+        tag = elem.tag
+        if count_pattern is not None and tag in ('article', 'div') and count_pattern.search(elem.get('class', '')):
+            matched[0] += 1
+        if tag == 'script' and elem.get('type') == 'application/ld+json':
+            try:
+                data = json.loads(elem.text or '')
+                if isinstance(data, dict) and 'numberOfItems' in data:
+                    counts['total'] = int(data['numberOfItems'])
+            except (ValueError, TypeError):
+                pass
+        elif tag in ('label', 'div', 'span') and len(elem) == 0 and elem.text:
+            text = elem.text
+            if not FILTER_TEXT_RE.search(text):
+                return
+            match = COUNT_RE.search(text)
+            if not match:
+                return
+            if 'Women' in text:
+                counts['women'] = int(match.group(1).replace(',', ''))
+            elif 'Men' in text:
+                counts['men'] = int(match.group(1).replace(',', ''))
+
+    for _ in iter_subtrees(html, lambda tag, attrib: False, on_end=on_end):
+        pass
+    return counts, matched[0]
@@ -0,0 +1,34 @@
+"""Alerts without recipients are never reported as sent"""
+
+from alerts import AlertSender
+
+
+class Messages:
+    def __init__(self):
+        self.sent = []
+
+    def create(self, body, from_, to):
+        self.sent.append(to)
+        return type('Message', (), {'sid': f"SM{len(self.sent)}"})()
+
+
+class Client:
+    def __init__(self):
+        self.messages = Messages()
+
+
+def sender():
+    return AlertSender(Client(), 'whatsapp:+10000000000', {'recipient_groups': {'team': ['whatsapp:+911']}})
+
+
+def test_group_is_expanded():
+    alerts = sender()
+    assert alerts.send('hi', '@team, whatsapp:+912')
+    assert sorted(alerts.client.messages.sent) == ['whatsapp:+911', 'whatsapp:+912']
+
+
+def test_unknown_group_or_empty_recipient_is_not_sent():
+    alerts = sender()
+    assert not alerts.send('hi', '@nobody')
+    assert not alerts.send('hi', '')
+    assert alerts.client.messages.sent == []
@@ -0,0 +1,62 @@
+"""Page archive storage and retention"""
+
+import json
+import os
+import random
+import time
+
+from archive import PageArchive
+
+
+def page(seed):
+    # Incompressible content so every blob has a predictable size
+    rng = random.Random(seed)
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(4000))
+
+
+def blobs(root):
+    objects = os.path.join(root, 'objects')
+    return sorted(name for prefix in os.listdir(objects) for name in os.listdir(os.path.join(objects, prefix)))
+
+
+def test_identical_pages_share_a_blob(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    first = archive.store('u', page(1))
+    assert archive.store('u', page(1)) == first
+    assert len(blobs(str(tmp_path))) == 1
+    assert [archive.read(entry) for entry in archive.entries()] == [page(1), page(1)]
+
+
+def test_prune_drops_oldest_over_budget(tmp_path):
+    archive = PageArchive(str(tmp_path), retention_days=None)
+    for seed in range(5):
+        archive.store('u', page(seed))
+    blob_size = os.path.getsize(archive.blob_path(next(archive.entries())['hash'], archive.codec))
+
+    archive.max_bytes = blob_size * 2.5
+    archive.prune()
+    assert [archive.read(entry) for entry in archive.entries()] == [page(3), page(4)]
+    assert len(blobs(str(tmp_path))) == 2
+
+
+def test_prune_keeps_shared_blobs_and_tmp_files(tmp_path):
+    archive = PageArchive(str(tmp_path), retention_days=1)
+    archive.store('u', page(1))
+    archive.store('u', page(2))
+
+    # Age the first fetch of page 1 past retention; a later fetch still references the blob
+    entries = list(archive.entries())
+    entries[0]['ts'] = time.time() - 2 * 86400
+    with open(archive.index_path, 'w') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+    archive.store('u', page(1))
+
+    digest = entries[1]['hash']
+    in_progress = archive.blob_path(digest, archive.codec) + '.123.tmp'
+    open(in_progress, 'wb').close()
+
+    archive.prune()
+    assert [archive.read(entry) for entry in archive.entries()] == [page(2), page(1)]
+    assert os.path.exists(in_progress)
+    assert not any(name.endswith('.tmp') for name in os.listdir(str(tmp_path)))
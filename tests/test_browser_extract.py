@@ -0,0 +1,42 @@
+"""In-browser product extraction against the Python parsers (needs Chrome)"""
+
+from urllib.parse import quote
+
+import pytest
+
+from browser_extract import extract_products_in_browser
+from monitor_products import SheinProductMonitor
+from product_record import compact_products
+from test_targeted_parse import GRID
+
+
+@pytest.fixture(scope='module')
+def driver():
+    webdriver = pytest.importorskip('selenium.webdriver')
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    try:
+        driver = webdriver.Chrome(options=options)
+    except Exception as e:
+        pytest.skip(f"Chrome is not available: {e}")
+    yield driver
+    driver.quit()
+
+
+def ids(products):
+    return {category: sorted(p.id for p in items) for category, items in products.items()}
+
+
+@pytest.mark.parametrize('html', [
+    GRID,
+    '<div class="product-item"><a href="/wishlist">♡</a>'
+    '<a href="/tee-p-7.html"><h3 class="name">Men Tee</h3></a></div>',
+])
+def test_in_browser_matches_full_soup(driver, html):
+    driver.get('data:text/html;charset=utf-8,' + quote(html))
+    in_browser = compact_products(extract_products_in_browser(driver))
+    full = SheinProductMonitor.extract_products(html)
+    assert ids(in_browser) == ids(full)
+    assert sorted(p.path for items in in_browser.values() for p in items) == \
+        sorted(p.path for items in full.values() for p in items)
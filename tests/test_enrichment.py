@@ -0,0 +1,42 @@
+"""Detail-page enrichment never mistakes a block page for a sold-out product"""
+
+from enrichment import ProductEnricher, StockWatch
+from product_record import Product
+
+
+class Response:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class Session:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, headers=None, timeout=None):
+        return self.response
+
+
+def enricher(tmp_path, response):
+    enricher = ProductEnricher({'enrich_cache_path': str(tmp_path / 'details.json')})
+    enricher.local.scraper = Session(response)
+    return enricher
+
+
+def test_challenge_page_keeps_last_known_sizes(tmp_path):
+    watch = StockWatch(str(tmp_path / 'watched.json'))
+    watch.entries['7'] = {'name': 'Men Tee', 'url': '/tee-p-7.html', 'sizes': ['M'], 'in_stock': True, 'checked_at': 0}
+    product = Product(7, 'Men Tee', '/tee-p-7.html', '₹499')
+
+    challenge = Response('<html><title>Just a moment...</title></html>')
+    enricher(tmp_path, challenge).enrich([product])
+
+    assert 'sizes' not in product
+    assert watch.update([product]) == []
+    assert watch.get(7)['sizes'] == ['M']
+    assert '7' not in enricher(tmp_path, challenge).cache.entries
@@ -0,0 +1,53 @@
+"""Facet rules compiled together with the built-in total and gender counts"""
+
+import pickle
+from functools import partial
+
+import pytest
+
+from facets import compile_facet_rules
+from monitor_simple import SheinMonitor
+
+
+PAGE = (
+    '<div>1,234 products</div>'
+    '<label>Women (2,914)</label><label>Men (7)</label>'
+    '<li>M <span>(120)</span></li><li>XL (3)</li><li>Black (5)</li>'
+)
+
+RULES = [
+    {'facet': 'size', 'labels': ['S', 'M', 'XL']},
+    {'facet': 'colour', 'pattern': 'bl(?:a|u)ck', 'ignore_case': True},
+]
+
+
+def test_one_scan_finds_builtin_and_facet_counts():
+    counts = compile_facet_rules(RULES).scan(PAGE)
+    assert counts == {'total': 1234, 'women': 2914, 'men': 7, 'size:M': 120, 'size:XL': 3, 'colour:Black': 5}
+
+
+def test_full_and_targeted_extractors_agree():
+    text_counts = compile_facet_rules(RULES)
+    full = SheinMonitor.extract_counts(PAGE, text_counts)
+    assert full == SheinMonitor.extract_counts_targeted(PAGE, text_counts)
+    assert full['size:M'] == 120
+
+
+def test_extractor_with_rules_pickles_for_the_parse_pool():
+    extractor = partial(SheinMonitor.extract_counts, text_counts=compile_facet_rules(RULES))
+    assert pickle.loads(pickle.dumps(extractor))(PAGE)['colour:Black'] == 5
+
+
+def test_without_builtin_only_facets_are_counted():
+    assert compile_facet_rules(RULES, builtin=False).scan(PAGE) == {'size:M': 120, 'size:XL': 3, 'colour:Black': 5}
+
+
+@pytest.mark.parametrize('rule', [
+    {'facet': 'size', 'pattern': '(?P<count>M)'},
+    {'facet': 'size', 'pattern': 'M('},
+    {'facet': 'size'},
+    {'labels': ['M']},
+])
+def test_unusable_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        compile_facet_rules([rule])
@@ -0,0 +1,42 @@
+"""Counts from the embedded __INITIAL_STATE__"""
+
+from initial_state import extract_state, extract_state_counts
+from monitor_api import SheinMonitor
+
+
+def page(state, body=''):
+    return f'<html><script>window.__INITIAL_STATE__ = {state};</script><body>{body}</body></html>'
+
+
+def test_sibling_total_is_used():
+    html = page('{"listing":{"products":[1,2],"totalResults":1234},"cart":{"total":0}}')
+    assert extract_state_counts(html)['total'] == 1234
+
+
+def test_nested_total_is_ignored():
+    html = page('{"products":[1,2],"cart":{"total":0}}')
+    assert extract_state(html)['total'] is None
+    assert extract_state_counts(html)['total'] == 2
+
+
+def test_text_total_wins_over_product_list():
+    html = page('{"products":[1,2]}', '<span>1,234 items</span>')
+    assert SheinMonitor.extract_counts(html)['total'] == 1234
+
+
+def test_facet_counts():
+    html = page('{"products":[],"facets":[{"name":"Women","count":80},{"name":"Men","count":20}]}')
+    assert extract_state_counts(html) == {'total': 0, 'women': 80, 'men': 20}
+
+
+def test_brackets_and_terminators_inside_strings():
+    state = '{"title":"sale }; ends [soon] \\\\\\" {","products":[{"name":"a};b"}],"totalCount":7,"x":"};"}'
+    html = page(state)
+    result = extract_state(html)
+    assert result['total'] == 7
+    assert result['products'] == [{'name': 'a};b'}]
+
+
+def test_json_parse_form():
+    html = '<script>window.__INITIAL_STATE__ = JSON.parse("{\\"products\\":[1],\\"total\\":5}");</script>'
+    assert extract_state_counts(html)['total'] == 5
@@ -0,0 +1,81 @@
+"""Lease fencing and the alert outbox"""
+
+import time
+
+from leases import LeaseStore
+from worker import Worker
+
+
+URL = 'https://www.sheinindia.in/c/men-1'
+
+
+class FakeMonitor:
+    def __init__(self):
+        self.config = {}
+        self.saved = []
+        self.sent = []
+        self.alert = True
+
+    def send_whatsapp_alert(self, message, to=None):
+        self.sent.append((to, message))
+        return True
+
+    def save_counts(self, counts):
+        self.saved.append(counts)
+
+    def run_once(self):
+        if self.alert:
+            self.send_whatsapp_alert('changed', to='+911234567890')
+        self.save_counts({'total': 1})
+
+
+def store(tmp_path):
+    store = LeaseStore(str(tmp_path / 'leases.db'))
+    store.register({URL: 60})
+    return store
+
+
+def test_stale_holder_cannot_save(tmp_path):
+    leases = store(tmp_path)
+    stale = leases.claim('a', 0)
+    time.sleep(0.01)
+    current = leases.claim('b', 60)
+    assert current[1] > stale[1]
+
+    written = []
+    assert not leases.commit(URL, stale[1], [('null', 'late')], lambda: written.append('stale'))
+    assert leases.commit(URL, current[1], [('null', 'fresh')], lambda: written.append('current'))
+    assert written == ['current']
+    assert [row[2] for row in leases.pending_alerts(URL)] == ['fresh']
+
+
+def test_alerts_are_delivered_after_the_save(tmp_path):
+    leases = store(tmp_path)
+    monitor = FakeMonitor()
+    worker = Worker(monitor, leases, {'lease_seconds': 60})
+    assert worker.run_next()
+    assert monitor.saved == [{'total': 1}]
+    assert monitor.sent == [('+911234567890', 'changed')]
+    assert leases.pending_alerts(URL) == []
+
+
+def test_undelivered_alerts_are_retried_by_the_next_holder(tmp_path):
+    leases = store(tmp_path)
+    crashed = leases.claim('a', 0.05)
+    assert leases.commit(URL, crashed[1], [('"+911234567890"', 'left behind')])
+    time.sleep(0.1)
+
+    monitor = FakeMonitor()
+    monitor.alert = False
+    worker = Worker(monitor, leases, {'lease_seconds': 60})
+    assert worker.run_next()
+    assert monitor.sent == [('+911234567890', 'left behind')]
+
+
+def test_renew_only_extends_held_lease(tmp_path):
+    leases = store(tmp_path)
+    url, token = leases.claim('a', 1)
+    assert leases.renew(url, token, 60)
+    assert leases.holds(url, token)
+    assert not leases.renew(url, token + 1, 60)
+
@@ -0,0 +1,29 @@
+"""Profile requests are consumed exactly once by concurrent checks"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from profiler import CheckProfiler, request_profile
+
+
+def test_concurrent_claims_consume_each_request_once(tmp_path):
+    path = str(tmp_path / 'profile_request.json')
+    request_profile('https://example.com/c/a-1', 5, path)
+    request_profile('https://example.com/c/b-2', 1, path)
+
+    profiler = CheckProfiler({'profile_request_path': path})
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        claims = list(executor.map(lambda _: profiler.claim('https://example.com/c/a-1'), range(20)))
+
+    assert claims.count(True) == 5
+    assert profiler.load_requests() == [{'url': 'https://example.com/c/b-2', 'remaining': 1}]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_file_is_removed_when_no_requests_are_left(tmp_path):
+    path = str(tmp_path / 'profile_request.json')
+    request_profile('https://example.com/c/a-1', 1, path)
+    profiler = CheckProfiler({'profile_request_path': path})
+    assert profiler.claim('https://example.com/c/a-1')
+    assert not os.path.exists(path)
+    assert not profiler.claim('https://example.com/c/a-1')
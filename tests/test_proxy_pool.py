@@ -0,0 +1,58 @@
+"""Proxy retries within one check"""
+
+import pytest
+
+from proxy_pool import NoProxyAvailable, ProxyPool
+
+
+class Response:
+    def __init__(self, status_code, text='<html><title>Shein</title></html>'):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = text
+
+
+class Scraper:
+    proxies = None
+
+
+def pool(outcomes, proxies=('http://a', 'http://b', 'http://c'), **config):
+    """A pool whose proxies answer with outcomes[proxy url]"""
+    calls = []
+
+    def fetch(scraper):
+        url = scraper.proxies['https']
+        calls.append(url)
+        outcome = outcomes[url]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return ProxyPool(list(proxies), Scraper, config), fetch, calls
+
+
+def test_failed_proxy_is_retried_on_another():
+    outcomes = {'http://a': OSError('reset'), 'http://b': Response(503), 'http://c': Response(200)}
+    proxies, fetch, calls = pool(outcomes)
+    assert proxies.request(fetch).status_code == 200
+    assert calls[-1] == 'http://c' and len(set(calls)) == len(calls)
+
+
+def test_not_found_is_not_retried():
+    proxies, fetch, calls = pool({url: Response(404) for url in ('http://a', 'http://b', 'http://c')})
+    assert proxies.request(fetch).status_code == 404
+    assert len(calls) == 1
+
+
+def test_last_error_is_raised_when_every_attempt_fails():
+    proxies, fetch, calls = pool({'http://a': OSError('a'), 'http://b': OSError('b')}, ('http://a', 'http://b'), proxy_attempts=5)
+    with pytest.raises(OSError):
+        proxies.request(fetch)
+    assert sorted(calls) == ['http://a', 'http://b']
+    assert [s['requests'] for s in proxies.snapshot()] == [1, 1]
+
+
+def test_no_proxy_available():
+    proxies, fetch, calls = pool({}, ())
+    with pytest.raises(NoProxyAvailable):
+        proxies.request(fetch)
@@ -0,0 +1,39 @@
+"""ETags of the read API depend on the response encoding"""
+
+from http.client import HTTPConnection
+import socket
+
+from read_api import start_read_api
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get(port, **headers):
+    conn = HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request('GET', '/counts', headers=headers)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response
+
+
+def test_gzip_and_identity_have_different_etags():
+    port = free_port()
+    start_read_api(port).update_counts('https://example.com/c/a-1', {'total': 1})
+
+    plain = get(port)
+    gzipped = get(port, **{'Accept-Encoding': 'gzip'})
+    assert gzipped.getheader('Content-Encoding') == 'gzip'
+    assert plain.getheader('ETag') != gzipped.getheader('ETag')
+    assert gzipped.getheader('Vary') == 'Accept-Encoding'
+
+    # A tag cached for one encoding does not validate the other
+    assert get(port, **{'If-None-Match': plain.getheader('ETag')}).status == 304
+    assert get(port, **{'If-None-Match': plain.getheader('ETag'), 'Accept-Encoding': 'gzip'}).status == 200
+    not_modified = get(port, **{'If-None-Match': gzipped.getheader('ETag'), 'Accept-Encoding': 'gzip'})
+    assert not_modified.status == 304
+    assert not_modified.getheader('Vary') == 'Accept-Encoding'
@@ -0,0 +1,52 @@
+"""Coalesced fetches and parses"""
+
+import threading
+import time
+
+from parse_pool import ParsePool
+from product_record import Product
+from shared_fetch import SharedFetch
+
+
+def extract(html):
+    return {'men': [Product(1, html, '/tee-p-1.html', '₹499')], 'women': []}
+
+
+def test_concurrent_consumers_share_one_fetch():
+    shared = SharedFetch(ttl=5)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return '<html></html>'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(shared.fetch('http', 'u', fetch))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ['<html></html>'] * 4
+    assert shared.hits == 3
+
+
+def test_parsed_results_are_private_copies():
+    shared = SharedFetch(ttl=5)
+    pool = ParsePool(0)
+    first = shared.parse(pool, extract, 'k', 'Tee')
+    first['men'][0]['sizes'] = ['M']
+    second = shared.parse(pool, extract, 'k', 'Tee')
+    assert 'sizes' not in second['men'][0]
+    assert shared.hits == 1
+
+
+def test_parse_async_returns_future_and_shares_the_result():
+    shared = SharedFetch(ttl=5)
+    pool = ParsePool(0)
+    first = shared.parse_async(pool, extract, 'k', 'Tee')
+    second = shared.parse_async(pool, extract, 'k', 'Tee')
+    assert first.result()['men'][0].name == second.result()['men'][0].name == 'Tee'
+    assert first.result()['men'][0] is not second.result()['men'][0]
+    assert shared.hits == 1
@@ -0,0 +1,122 @@
+"""Streaming sitemap scans"""
+
+import gzip
+
+import pytest
+
+from block_detect import PageBlocked
+from sitemap import SitemapScanner
+
+
+INDEX = b'''<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<sitemap><loc>https://shop.test/sitemap-product-1.xml.gz</loc><lastmod>2026-10-01</lastmod></sitemap>
+<sitemap><loc>https://shop.test/sitemap-pages.xml</loc><lastmod>2026-10-01</lastmod></sitemap>
+</sitemapindex>'''
+
+SHARD = b'''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>https://shop.test/men-cotton-shirt-p-101.html</loc><lastmod>2026-10-02</lastmod></url>
+<url><loc>https://shop.test/women-floral-dress-p-102.html</loc></url>
+<url><loc>https://shop.test/about-us</loc></url>
+</urlset>'''
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    @property
+    def text(self):
+        raise AssertionError("streamed responses must not be read as text")
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), 64):
+            yield self.body[start:start + 64]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        return self.pages[url]
+
+
+def scanner(tmp_path, pages):
+    scanner = SitemapScanner({
+        'sitemap_url': 'https://shop.test/sitemap.xml',
+        'sitemap_state_path': str(tmp_path / 'sitemap_state.json'),
+    })
+    scanner.scraper = FakeSession(pages)
+    return scanner
+
+
+def test_gzipped_shard_is_streamed(tmp_path):
+    scan = scanner(tmp_path, {
+        'https://shop.test/sitemap.xml': FakeResponse(INDEX),
+        'https://shop.test/sitemap-product-1.xml.gz': FakeResponse(gzip.compress(SHARD), headers={'ETag': '"v1"'}),
+    })
+    scan.seeded = True  # Past the seeding scan
+    found = scan.scan()
+    assert [p.id for p in found['men']] == [101]
+    assert [p.id for p in found['women']] == [102]
+    assert found['men'][0]['listed_at'] == '2026-10-02'
+    assert scan.shards['https://shop.test/sitemap-product-1.xml.gz']['etag'] == '"v1"'
+
+
+def test_block_page_is_classified_from_first_chunk(tmp_path):
+    page = FakeResponse(b'<html><title>Just a moment...</title></html>' + b' ' * 4096, status_code=403)
+    scan = scanner(tmp_path, {'https://shop.test/sitemap.xml': page})
+    with pytest.raises(PageBlocked):
+        scan.stream('https://shop.test/sitemap.xml')
+    assert page.closed
+
+
+TWO_SHARDS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<sitemap><loc>https://shop.test/sitemap-product-1.xml</loc><lastmod>2026-10-01</lastmod></sitemap>
+<sitemap><loc>https://shop.test/sitemap-product-2.xml</loc><lastmod>2026-10-01</lastmod></sitemap>
+</sitemapindex>'''
+
+SHARD_2 = b'''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>https://shop.test/men-denim-jacket-p-201.html</loc></url>
+<url><loc>https://shop.test/women-linen-top-p-202.html</loc></url>
+</urlset>'''
+
+
+def test_shard_that_failed_while_seeding_is_not_reported_later(tmp_path):
+    pages = {
+        'https://shop.test/sitemap.xml': FakeResponse(TWO_SHARDS),
+        'https://shop.test/sitemap-product-1.xml': FakeResponse(SHARD),
+        'https://shop.test/sitemap-product-2.xml': FakeResponse(b'', status_code=500),
+    }
+    scan = scanner(tmp_path, pages)
+    assert scan.scan() == {'men': [], 'women': []}
+    assert not scan.seeded
+
+    # A fresh process picks up the saved state and finishes seeding
+    pages['https://shop.test/sitemap-product-2.xml'] = FakeResponse(SHARD_2)
+    scan = scanner(tmp_path, pages)
+    assert scan.scan() == {'men': [], 'women': []}
+    assert scan.seeded
+
+
+def test_scan_is_skipped_while_another_worker_holds_the_lease(tmp_path):
+    scan = scanner(tmp_path, {})
+    held = scan.lock()
+    try:
+        assert scanner(tmp_path, {}).scan() == {'men': [], 'women': []}
+    finally:
+        held.close()
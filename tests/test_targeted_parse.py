@@ -0,0 +1,56 @@
+"""Targeted (streaming) product parser against the full-soup extractor"""
+
+from monitor_products import SheinProductMonitor
+import targeted_parse
+
+
+def card(product_id, name, price='₹499'):
+    return (
+        '<div class="product-card">'
+        f'<a href="/{name.lower().replace(" ", "-")}-p-{product_id}.html">'
+        f'<h3 class="product-name">{name}</h3></a>'
+        f'<span class="price">{price}</span>'
+        '</div>'
+    )
+
+
+GRID = (
+    '<html><body>'
+    '<div class="product-list">'
+    '<div class="product-filters"><a href="/c/men-1">Men</a></div>'
+    + card(101, "Men Cotton Shirt")
+    + card(102, "Women Floral Dress")
+    + '<div class="product-row">'
+    + card(103, "Mens Denim Jacket")
+    + card(104, "Ladies Top")
+    + '</div>'
+    '</div>'
+    '</body></html>'
+)
+
+
+def ids(products):
+    return {category: sorted(p.id for p in items) for category, items in products.items()}
+
+
+def test_targeted_matches_full_soup():
+    targeted = targeted_parse.extract_products(GRID)
+    full = SheinProductMonitor.extract_products(GRID)
+    assert ids(targeted) == ids(full)
+    assert ids(targeted) == {'men': [101, 103], 'women': [102, 104]}
+
+
+def test_containers_are_not_cards():
+    products = targeted_parse.extract_products(GRID)
+    names = sorted(p.name for items in products.values() for p in items)
+    assert names == ['Ladies Top', 'Men Cotton Shirt', 'Mens Denim Jacket', 'Women Floral Dress']
+
+
+def test_card_uses_product_link():
+    html = (
+        '<div class="product-item"><a href="/wishlist">♡</a>'
+        '<a href="/tee-p-7.html"><h3 class="name">Men Tee</h3></a></div>'
+    )
+    targeted = targeted_parse.extract_products(html)
+    full = SheinProductMonitor.extract_products(html)
+    assert [p.path for p in targeted['men']] == [p.path for p in full['men']] == ['/tee-p-7.html']
@@ -0,0 +1,43 @@
+"""Webhook retries never hold up later events"""
+
+import time
+
+from events import EventBus, WebhookSender
+
+
+class FlakySender(WebhookSender):
+    """Records posts instead of sending them; the first post of each event in `fail_once` fails"""
+
+    def __init__(self, bus, fail_once):
+        self.fail_once = set(fail_once)
+        self.posted = []
+        super().__init__(bus, 'http://hook.invalid', retries=2)
+
+    def post(self, event):
+        if event['id'] in self.fail_once:
+            self.fail_once.discard(event['id'])
+            raise OSError('connection refused')
+        self.posted.append((event['id'], time.monotonic()))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_failed_event_is_retried_without_blocking_later_ones():
+    bus = EventBus()
+    sender = FlakySender(bus, fail_once={1})
+    try:
+        started = time.monotonic()
+        bus.publish('counts', {'n': 1})
+        bus.publish('counts', {'n': 2})
+        assert wait_for(lambda: len(sender.posted) == 2)
+        posted = dict(sender.posted)
+        # Event 2 went out right away; event 1 followed after its one-second backoff
+        assert posted[2] - started < 0.5
+        assert posted[1] > posted[2]
+    finally:
+        sender.stop()
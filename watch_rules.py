@@ -0,0 +1,101 @@
+"""
+Indexed watch-rule matching
+Matches new products against every subscriber's keyword, size, price and category
+rules in a single pass using an inverted token index
+"""
+
+import re
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+PRICE_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+MEN_KEYWORDS = {'men', 'man', 'mens', "men's", 'male', 'boy', 'boys'}
+
+
+def tokenize(text):
+    """Lowercase word tokens, so 'men' never matches inside 'women'"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def is_mens_text(text):
+    """Whether a product's text mentions a men's keyword as a whole word"""
+    return not MEN_KEYWORDS.isdisjoint(tokenize(text))
+
+
+def parse_price(price):
+    """First number in a price label such as '₹1,299', or None"""
+    match = PRICE_RE.search(price or '')
+    if not match:
+        return None
+    return float(match.group(0).replace(',', ''))
+
+
+class WatchRule:
+    """One subscriber rule: every constraint that is set must hold"""
+
+    def __init__(self, subscriber, spec):
+        self.subscriber = subscriber
+        self.phrases = [tuple(tokenize(k)) for k in spec.get('keywords', []) if tokenize(k)]
+        self.category = spec.get('category')
+        self.max_price = spec.get('max_price')
+        self.sizes = {s.upper() for s in spec.get('sizes', [])}
+
+    def accepts(self, product, category, token_text):
+        """Check every constraint; token_text is the space-padded, tokenized product name"""
+        if self.category and self.category != category:
+            return False
+        if self.max_price is not None:
+            price = parse_price(product.get('price'))
+            if price is None or price > self.max_price:
+                return False
+        if self.sizes:
+            available = {s.upper() for s in product.get('sizes', [])}
+            if not self.sizes & available:
+                return False
+        if self.phrases:
+            return any(f" {' '.join(p)} " in token_text for p in self.phrases)
+        return True
+
+
+class WatchRuleEngine:
+    """All subscribers' rules indexed by keyword token"""
+
+    def __init__(self, subscribers):
+        self.subscribers = subscribers
+        self.index = {}
+        self.unkeyed = []
+        for subscriber in subscribers:
+            for spec in subscriber.get('rules', [{}]):
+                rule = WatchRule(subscriber, spec)
+                if rule.phrases:
+                    for first in {p[0] for p in rule.phrases}:
+                        self.index.setdefault(first, []).append(rule)
+                else:
+                    self.unkeyed.append(rule)
+
+    def match_product(self, product, category):
+        """Return the subscribers whose rules match one product"""
+        tokens = tokenize(product.get('name', ''))
+        token_text = f" {' '.join(tokens)} "
+        candidates = list(self.unkeyed)
+        seen = set()
+        for token in set(tokens):
+            for rule in self.index.get(token, ()):
+                if id(rule) not in seen:
+                    seen.add(id(rule))
+                    candidates.append(rule)
+
+        matched = {}
+        for rule in candidates:
+            if id(rule.subscriber) not in matched and rule.accepts(product, category, token_text):
+                matched[id(rule.subscriber)] = rule.subscriber
+        return list(matched.values())
+
+    def match(self, new_products):
+        """Return [(subscriber, products)] for new products given as {category: [products]}"""
+        matches = {}
+        for category, products in new_products.items():
+            for product in products:
+                for subscriber in self.match_product(product, category):
+                    matches.setdefault(id(subscriber), (subscriber, []))[1].append(product)
+        return [matches[id(s)] for s in self.subscribers if id(s) in matches]
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Sharded monitor worker
+Runs any number of worker processes against a shared lease database; each claims due
+category checks, runs them with one of the monitors and releases them for the next cycle
+"""
+
+import importlib
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+
+from leases import LeaseStore
+from discovery import CategoryDiscovery
+
+
+MONITORS = {
+    'api': ('monitor_api', 'SheinMonitor'),
+    'simple': ('monitor_simple', 'SheinMonitor'),
+    'browser': ('monitor', 'SheinMonitor'),
+    'products': ('monitor_products', 'SheinProductMonitor'),
+}
+
+
+def configured_checks(config):
+    """Return {url: interval_seconds} from the `urls` list, falling back to the single `url`"""
+    default_interval = config.get('check_interval_seconds', 300)
+    checks = {}
+    for entry in config.get('urls') or [config.get('url', 'https://www.sheinindia.in/c/sverse-5939-37961')]:
+        if isinstance(entry, dict):
+            checks[entry['url']] = entry.get('check_interval_seconds', default_interval)
+        else:
+            checks[entry] = default_interval
+    return checks
+
+
+def scheduled_checks(config):
+    """Configured checks plus, in discovery mode, the sub-categories and brands found below them
+
+    Returns (checks, complete); complete is False when discovery had no fresh result, in
+    which case checks that are missing from the list must not be retired.
+    """
+    checks = configured_checks(config)
+    if not config.get('discover_categories'):
+        return checks, True
+    discovery = CategoryDiscovery(config)
+    categories = discovery.discover(list(checks)) or []
+    interval = config.get('discover_check_interval_seconds', config.get('check_interval_seconds', 300))
+    for url in categories:
+        checks.setdefault(url, interval)
+    return checks, bool(categories) and not discovery.stale
+
+
+def storage_name(url):
+    """File name used to keep one category's state apart from the others"""
+    slug = url.rstrip('/').rsplit('/', 1)[-1]
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', slug) + '.json'
+
+
+class Worker:
+    """Claims leased checks and runs them on a single monitor instance"""
+
+    def __init__(self, monitor, store, config):
+        self.monitor = monitor
+        self.store = store
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = config.get('lease_seconds', 600)
+        self.poll_seconds = config.get('worker_poll_seconds', 5)
+        self.storage_dir = config.get('storage_dir', 'state')
+        self.lease = None
+        self.outbox = []
+        self.rediscover_at = None
+
+        # Only the current lease holder may alert or save state: alerts are queued and
+        # committed together with the saved state, then delivered from the lease database
+        self.send_alert = monitor.send_whatsapp_alert
+        monitor.send_whatsapp_alert = self.send_whatsapp_alert
+        self.send_alerts = getattr(monitor, 'send_whatsapp_alerts', None)
+        if self.send_alerts:
+            monitor.send_whatsapp_alerts = self.send_whatsapp_alerts
+        self.save_name = 'save_counts' if hasattr(monitor, 'save_counts') else 'save_tracked_products'
+        self.save_state = getattr(monitor, self.save_name)
+        setattr(monitor, self.save_name, self.save_fenced)
+
+    def send_whatsapp_alert(self, message, to=None):
+        """Queue the alert for the outbox; it is committed with the check's state and sent afterwards"""
+        url, token = self.lease
+        if not self.store.holds(url, token):
+            print(f"⚠ Lease for {url} lost, skipping alert")
+            return False
+        self.outbox.append((json.dumps(to), message))
+        return True
+
+    def send_whatsapp_alerts(self, alerts):
+        """Queue a batch of (message, to) alerts for the outbox"""
+        return [self.send_whatsapp_alert(message, to=to) for message, to in alerts]
+
+    def save_fenced(self, *args, **kwargs):
+        """Save the monitor's state and queued alerts in one transaction, only while the lease is held"""
+        url, token = self.lease
+        alerts, self.outbox = self.outbox, []
+        if not self.store.commit(url, token, alerts, lambda: self.save_state(*args, **kwargs)):
+            print(f"⚠ Lease for {url} lost, not saving state or alerts")
+
+    def deliver(self, url, token):
+        """Send the committed alerts for a category, including any left behind by a crashed worker"""
+        pending = self.store.pending_alerts(url)
+        if not pending:
+            return
+        if not self.store.holds(url, token):
+            print(f"⚠ Lease for {url} lost, leaving alerts for the next holder")
+            return
+        if self.send_alerts:
+            # Monitors that can batch send every pending alert through their pool at once
+            sent = self.send_alerts([(message, json.loads(recipient)) for _, recipient, message in pending])
+        else:
+            sent = []
+            for _, recipient, message in pending:
+                to = json.loads(recipient)
+                sent.append(self.send_alert(message) if to is None else self.send_alert(message, to=to))
+        for (alert_token, recipient, _), ok in zip(pending, sent):
+            self.store.finish_alert(url, alert_token, recipient, ok)
+
+    def start_heartbeat(self, url, token):
+        """Renew the lease in the background so long checks keep it; returns the event that stops it"""
+        stop = threading.Event()
+
+        def beat():
+            # SQLite connections belong to one thread
+            store = LeaseStore(self.store.db_path)
+            try:
+                while not stop.wait(self.lease_seconds / 3):
+                    if not store.renew(url, token, self.lease_seconds):
+                        print(f"⚠ Lease for {url} could not be renewed")
+                        return
+            finally:
+                store.close()
+
+        threading.Thread(target=beat, name=f"lease-{token}", daemon=True).start()
+        return stop
+
+    def bind(self, url):
+        """Point the monitor at a claimed category"""
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self.monitor.url = url
+        self.monitor.storage_path = os.path.join(self.storage_dir, storage_name(url))
+        if hasattr(self.monitor, 'extract_category_id'):
+            self.monitor.category_id = self.monitor.extract_category_id(url)
+
+    def register(self):
+        """Schedule the configured (and discovered) categories and retire any others"""
+        config = self.monitor.config
+        checks, complete = scheduled_checks(config)
+        self.store.register(checks, retire=complete)
+        if config.get('discover_categories'):
+            if complete:
+                self.rediscover_at = time.time() + config.get('discover_cache_ttl_seconds', 86400)
+            else:
+                print("⚠ No fresh discovery result, keeping every scheduled category")
+                self.rediscover_at = time.time() + config.get('discover_retry_seconds', 600)
+        return checks
+
+    def reload_config(self):
+        """Apply config.json edits: schedule new categories, retire removed ones, update intervals"""
+        config = self.monitor.config_watcher.poll()
+        if config is not None:
+            try:
+                self.monitor.apply_config(config)
+            except ValueError as e:
+                print(f"⚠ Could not fully apply {self.monitor.config_watcher.path}: {e}")
+        elif self.rediscover_at is None or time.time() < self.rediscover_at:
+            return
+        checks = self.register()
+        print(f"✓ Schedule updated: {len(checks)} categories")
+
+    def run_next(self):
+        """Claim and run one due check; returns False when nothing was due"""
+        self.lease = self.store.claim(self.worker_id, self.lease_seconds)
+        if self.lease is None:
+            return False
+        url, token = self.lease
+        heartbeat = self.start_heartbeat(url, token)
+        try:
+            self.bind(url)
+            self.monitor.run_once()
+            if self.outbox:
+                # The check alerted but did not save; still hand the alerts to the outbox
+                alerts, self.outbox = self.outbox, []
+                self.store.commit(url, token, alerts)
+            self.deliver(url, token)
+        finally:
+            heartbeat.set()
+            self.outbox = []
+            if not self.store.complete(url, token):
+                print(f"⚠ Lease for {url} expired before the check finished")
+            self.lease = None
+        return True
+
+    def run_forever(self):
+        """Keep claiming checks until interrupted"""
+        print(f"🚀 Worker {self.worker_id} started")
+        try:
+            while True:
+                self.reload_config()
+                if not self.run_next():
+                    wait = self.store.next_due_in()
+                    time.sleep(min(self.poll_seconds, wait) if wait is not None else self.poll_seconds)
+        except KeyboardInterrupt:
+            print("\n\n👋 Worker stopped by user")
+        finally:
+            driver_manager = getattr(self.monitor, 'driver_manager', None)
+            if driver_manager:
+                driver_manager.quit()
+
+
+def main():
+    """Command line entry point: worker.py [api|simple|browser|products] [config.json]"""
+    kind = sys.argv[1] if len(sys.argv) > 1 else 'api'
+    config_path = sys.argv[2] if len(sys.argv) > 2 else 'config.json'
+    if kind not in MONITORS:
+        print(f"Usage: python3 worker.py [{'|'.join(MONITORS)}] [config.json]")
+        sys.exit(1)
+
+    module_name, class_name = MONITORS[kind]
+    monitor = getattr(importlib.import_module(module_name), class_name)(config_path)
+    store = LeaseStore(monitor.config.get('lease_db', 'leases.db'))
+    worker = Worker(monitor, store, monitor.config)
+    worker.register()
+    worker.run_forever()
+
+
+if __name__ == '__main__':
+    main()